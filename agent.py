@@ -1,57 +1,109 @@
+import argparse
+import json
 import os
+import re
+import sys
+import threading
+import time
 from dotenv import load_dotenv
-from mcp import ClientSession, StdioServerParameters, types
+from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 import asyncio
-from google import genai
-from concurrent.futures import TimeoutError
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from contextlib import asynccontextmanager
+from llm_cache import LLMCache
+from conversation_context import ConversationContext, shorten
+from directive_parser import DirectiveParser
+from function_calling import FUNCTION_SYSTEM_PROMPT, function_calls, function_config
+from llm_controller import LLMController, estimate_tokens
+from metrics import StageStats
+from tool_registry import ToolRegistry
+from tracing import Tracer
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Access your API key and initialize Gemini client correctly
-api_key = os.getenv("GOOGLE_API_KEY")  # Changed to GOOGLE_API_KEY to match your .env
-if not api_key:
-    print("ERROR: GOOGLE_API_KEY environment variable is not set!")
-    print(
-        "Please create a .env file with your GOOGLE_API_KEY or set it in your environment."
-    )
-    exit(1)
+# Gemini client, created on first use (see get_client); benchmarks and tests may
+# assign a stand-in here before running the agent
+client = None
+
+
+def get_client():
+    """Return the Gemini client, creating it from GOOGLE_API_KEY on first use."""
+    global client
+    if client is None:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise RuntimeError(
+                "GOOGLE_API_KEY environment variable is not set! Please create a .env "
+                "file with your GOOGLE_API_KEY or set it in your environment."
+            )
+        # Imported here: runs answered from the cache or a stand-in never need it
+        from google import genai
+
+        client = genai.Client(api_key=api_key)
+        print("Successfully initialized Gemini client")
+    return client
+
+
+MODEL_NAME = "gemini-2.0-flash"
 
-# Initialize the client with the API key
-try:
-    client = genai.Client(api_key=api_key)
-    print("Successfully initialized Gemini client")
-except Exception as e:
-    print(f"Failed to initialize Gemini client: {e}")
-    exit(1)
+# Identical prompts are answered from disk instead of the network (AGENT_LLM_CACHE=0 disables)
+llm_cache = LLMCache()
+
+# Shared by every concurrent run so they back off together (AGENT_LLM_* settings)
+llm_controller = LLMController()
+
+# Client-side stage latencies: handshake, llm, coercion, tool
+stage_stats = StageStats()
+
+# Spans of each query, written as JSON lines to AGENT_TRACE ("stderr" or a file path)
+tracer = Tracer("agent", stage_stats, env="AGENT_TRACE")
 
 max_iterations = 1  # Only need 1 iteration: create and edit
-last_response = None
-iteration = 0
-iteration_response = []
-keynote_file_path = None  # Store the path to the created Keynote file
 
+# Tool results report where the deck went: "... created and saved to /path/deck.key",
+# followed by the end of the message, " and exported ...", " (reused from cache)" or
+# ": N slide operations", or by the quote closing the JSON-encoded message;
+# paths may contain spaces
+SAVED_PATH_PATTERN = re.compile(r"saved to (.+?\.key)(?=$|[\]:,\"'\\]| and | \()")
+
+
+async def generate_with_timeout(client, prompt, timeout=None, executor=None, config=None):
+    """Generate content under the shared rate limiter, retrying throttled or transient
+    failures; `timeout` applies per attempt. Repeated prompts are served from the cache.
+
+    `config` (e.g. function declarations) is passed through and is part of the cache key."""
+    cache_prompt = prompt
+    if config is not None:
+        cache_prompt = f"{prompt}\0{config.model_dump_json(exclude_none=True)}"
+    cached = llm_cache.get(MODEL_NAME, cache_prompt)
+    if cached is not None:
+        print("LLM response served from cache")
+        return cached
 
-async def generate_with_timeout(
-    client, prompt, timeout=2000
-):  # Increased timeout for complex tasks
-    """Generate content with a timeout"""
     print("Starting LLM generation...")
     try:
         # Convert the synchronous generate_content call to run in a thread
         loop = asyncio.get_event_loop()
-        response = await asyncio.wait_for(
-            loop.run_in_executor(
-                None,
+        response = await llm_controller.call(
+            lambda: loop.run_in_executor(
+                executor,
                 lambda: client.models.generate_content(
-                    model="gemini-2.0-flash", contents=prompt
+                    model=MODEL_NAME, contents=prompt, config=config
                 ),
             ),
+            prompt_tokens=estimate_tokens(prompt),
             timeout=timeout,
+            usage_tokens=response_tokens,
         )
         print("LLM generation completed")
+        llm_cache.put(
+            MODEL_NAME,
+            cache_prompt,
+            response.text,
+            function_calls(response) if config is not None else None,
+        )
         return response
     except TimeoutError:
         print("LLM generation timed out!")
@@ -61,289 +113,819 @@ async def generate_with_timeout(
         raise
 
 
-def reset_state():
-    """Reset all global variables to their initial state"""
-    global last_response, iteration, iteration_response, keynote_file_path
-    last_response = None
-    iteration = 0
-    iteration_response = []
-    keynote_file_path = None
-
-
-async def main():
-    reset_state()  # Reset at the start of main
-    print("Starting main execution...")
+async def stream_directive(client, prompt, timeout=None, executor=None):
+    """Stream a response and return its directives as soon as they are complete.
+
+    That is the run of consecutive FUNCTION_CALL lines starting at the first one
+    (the line after them ends it), or else the first FINAL_ANSWER line. The rest of
+    the generation is abandoned: the producer thread stops at the next chunk and
+    closes the stream. Returns "" when the response holds no directive."""
+    # Cached under a key of its own: the entry is the directive, not the full response
+    cache_prompt = f"{prompt}\0stream"
+    cached = llm_cache.get(MODEL_NAME, cache_prompt)
+    if cached is not None:
+        print("LLM response served from cache")
+        return cached.text
+
+    async def consume():
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+
+        def post(item):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:  # the loop is already gone
+                pass
+
+        def produce():
+            stream = client.models.generate_content_stream(
+                model=MODEL_NAME, contents=prompt
+            )
+            try:
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    post(chunk.text or "")
+            except Exception as e:
+                post(e)
+            finally:
+                stream.close()
+                post(None)
+
+        producer = loop.run_in_executor(executor, produce)
+        parser = DirectiveParser()
+        calls = []
+
+        def reply(lines):
+            """The directives to act on, once these lines settle them; else None."""
+            for line in lines:
+                if line.startswith("FUNCTION_CALL:"):
+                    calls.append(line)
+                elif calls and line:
+                    return "\n".join(calls)
+                elif line.startswith("FINAL_ANSWER:"):
+                    return line
+            return None
+
+        try:
+            while (item := await chunks.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                directives = reply(parser.feed_lines(item))
+                if directives is not None:
+                    print(f"Directives complete after {parser.lines} lines, cancelling stream")
+                    return directives
+            return reply(parser.finish_lines()) or "\n".join(calls)
+        finally:
+            stop.set()
+
+    print("Starting streamed LLM generation...")
     try:
-        # Create a single MCP server connection
-        print("Establishing connection to MCP server...")
-        server_params = StdioServerParameters(
-            command="python", args=["mcp_server.py"]
-        )  # Changed to mcp_server.py
+        directive = await llm_controller.call(
+            consume, prompt_tokens=estimate_tokens(prompt), timeout=timeout
+        )
+    except Exception as e:
+        print(f"Error in streamed LLM generation: {e}")
+        raise
+    # Only the directive is cached; it is all the agent ever reads from a response
+    llm_cache.put(MODEL_NAME, cache_prompt, directive or None)
+    return directive
 
-        async with stdio_client(server_params) as (read, write):
-            print("Step:1 - Connection established, creating session...")
-            async with ClientSession(read, write) as session:
-                print("Step:2 - Session created, initializing...")
-                await session.initialize()
 
-                # Get available tools
-                print("Requesting tool list...")
-                tools_result = await session.list_tools()
-                tools = tools_result.tools
-                print(f"Step:3 - Successfully retrieved {len(tools)} tools")
+def response_tokens(response):
+    """Total tokens billed for a response, when the API reports usage."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
 
-                # Create system prompt with available tools
-                print("Step:4 - Creating system prompt...")
-                print(f"Number of tools: {len(tools)}")
 
-                try:
-                    tools_description = []
-                    for i, tool in enumerate(tools):
-                        try:
-                            # Get tool properties
-                            params = tool.inputSchema
-                            desc = getattr(
-                                tool, "description", "No description available"
-                            )
-                            name = getattr(tool, "name", f"tool_{i}")
-
-                            # Format the input schema in a more readable way
-                            if "properties" in params:
-                                param_details = []
-                                for param_name, param_info in params[
-                                    "properties"
-                                ].items():
-                                    param_type = param_info.get("type", "unknown")
-                                    param_details.append(f"{param_name}: {param_type}")
-                                params_str = ", ".join(param_details)
-                            else:
-                                params_str = "no parameters"
-
-                            tool_desc = f"{i+1}. {name}({params_str}) - {desc}"
-                            tools_description.append(tool_desc)
-                            print(f"Added description for tool: {tool_desc}")
-                        except Exception as e:
-                            print(f"Error processing tool {i}: {e}")
-                            tools_description.append(f"{i+1}. Error processing tool")
-
-                    tools_description = "\n".join(tools_description)
-                    print("Successfully created tools description")
-                except Exception as e:
-                    print(f"Error creating tools description: {e}")
-                    tools_description = "Error loading tools"
+def build_tools_description(tools):
+    """Describe the available tools, one numbered line each, for the system prompt"""
+    try:
+        tools_description = []
+        for i, tool in enumerate(tools):
+            try:
+                # Get tool properties
+                params = tool.inputSchema
+                desc = getattr(
+                    tool, "description", "No description available"
+                )
+                name = getattr(tool, "name", f"tool_{i}")
+
+                # Format the input schema in a more readable way
+                if "properties" in params:
+                    param_details = []
+                    for param_name, param_info in params[
+                        "properties"
+                    ].items():
+                        param_type = param_info.get("type", "unknown")
+                        param_details.append(f"{param_name}: {param_type}")
+                    params_str = ", ".join(param_details)
+                else:
+                    params_str = "no parameters"
+
+                tool_desc = f"{i+1}. {name}({params_str}) - {desc}"
+                tools_description.append(tool_desc)
+                print(f"Added description for tool: {tool_desc}")
+            except Exception as e:
+                print(f"Error processing tool {i}: {e}")
+                tools_description.append(f"{i+1}. Error processing tool")
+
+        tools_description = "\n".join(tools_description)
+        print("Successfully created tools description")
+    except Exception as e:
+        print(f"Error creating tools description: {e}")
+        tools_description = "Error loading tools"
+    return tools_description
 
-                print("Step:5 - Tool Description Created")
-                print("Created system prompt...")
 
-                # Update examples to match your current available tools
-                system_prompt = f"""You are a Keynote presentation assistant. You help create and edit Keynote presentations.
+def build_system_prompt(tools_description):
+    # Update examples to match your current available tools
+    return f"""You are a Keynote presentation assistant. You help create and edit Keynote presentations.
 
 Available tools:
 {tools_description}
 
-You must respond with EXACTLY ONE line in one of these formats (no additional text):
-1. For function calls:
+You must respond with lines in one of these formats (no additional text):
+1. For function calls, one line per call:
    FUNCTION_CALL: function_name|param1|param2|...
-   
+
 2. For final answers:
    FINAL_ANSWER: [Your message here]
 
 Important:
 - In iteration 1: Create a new Keynote presentation with a title, content and save it to the desktop
+- For presentations with several slides, build the whole deck in one create_presentation_from_outline call (pass the slides as a JSON array)
+- To edit a deck you already created, call update_presentation with its path and the full list of slides it should have; only changed slides are rewritten
+- Independent operations (for example several separate decks) can be requested together, one FUNCTION_CALL line each; they run in parallel
 - Only give FINAL_ANSWER when you have completed all necessary operations
 
 Examples:
 - FUNCTION_CALL: create_keynote_with_text|Hello World|540|430
+- FUNCTION_CALL: create_presentation_from_outline|[{{"title": "Introduction", "bullets": ["Point 1", "Point 2"]}}, {{"title": "Summary", "bullets": ["Key takeaway"]}}]
 - FINAL_ANSWER: [Presentation created and edited successfully]
 
 DO NOT include any explanations or additional text.
-Your entire response should be a single line starting with either FUNCTION_CALL: or FINAL_ANSWER:"""
+Your entire response should be one or more FUNCTION_CALL: lines, or a single FINAL_ANSWER: line"""
 
-                # Define the presentation topic and edit content
-                presentation_topic = "Artificial Intelligence"
-                edit_content = "Add a slide about Machine Learning applications"
 
-                # Initial query for creating a presentation
-                query = f"Create a Keynote presentation about {presentation_topic}"
+# Text-mode system prompts by tool-list fingerprint
+system_prompts = {}
 
-                # Use global iteration variables
-                global iteration, last_response, keynote_file_path
 
-                while iteration < max_iterations:
-                    print(f"\n--- Iteration {iteration + 1} ---")
+async def connect_and_prepare(session, mode="text"):
+    """Initialize an MCP session and build everything that only depends on its tools.
 
-                    if iteration == 0:
-                        # First iteration: Create a presentation
-                        current_query = query
-                    elif iteration == 1:
-                        # Second iteration: Edit the presentation
-                        current_query = f"Now edit the presentation with this content: {edit_content}"
+    Returns a ToolRegistry for the session's tools and the system prompt. In
+    "function" mode the tools travel as function declarations, so the system prompt
+    does not describe them."""
+    print("Step:2 - Session created, initializing...")
+    with tracer.span("handshake"):
+        await session.initialize()
 
-                    # Add previous responses to the context
-                    if iteration_response:
-                        current_query = (
-                            current_query + "\n\n" + " ".join(iteration_response)
-                        )
+        # Get available tools
+        print("Requesting tool list...")
+        tools_result = await session.list_tools()
+    tools = ToolRegistry(tools_result.tools)
+    print(f"Step:3 - Successfully retrieved {len(tools)} tools")
 
-                    # Get model's response with timeout
-                    print("Preparing to generate LLM response...")
-                    prompt = f"{system_prompt}\n\nQuery: {current_query}"
-                    try:
-                        response = await generate_with_timeout(client, prompt)
-                        response_text = response.text.strip()
-                        print(f"LLM Response: {response_text}")
-
-                        # Find the FUNCTION_CALL line in the response
-                        for line in response_text.split("\n"):
-                            line = line.strip()
-                            if line.startswith("FUNCTION_CALL:") or line.startswith(
-                                "FINAL_ANSWER:"
-                            ):
-                                response_text = line
-                                break
+    if mode == "function":
+        print("Step:4 - Using native function calling")
+        return tools, FUNCTION_SYSTEM_PROMPT
 
+    # The prompt only changes when the tool set does
+    system_prompt = system_prompts.get(tools.fingerprint)
+    if system_prompt is not None:
+        print("Step:4 - Reusing system prompt for unchanged tools")
+        return tools, system_prompt
+
+    # Create system prompt with available tools
+    print("Step:4 - Creating system prompt...")
+    print(f"Number of tools: {len(tools)}")
+    tools_description = build_tools_description(tools)
+
+    print("Step:5 - Tool Description Created")
+    print("Created system prompt...")
+    system_prompt = system_prompts[tools.fingerprint] = build_system_prompt(
+        tools_description
+    )
+    return tools, system_prompt
+
+
+class AgentRun:
+    """State of one agent run over an initialized MCP session.
+
+    All per-run state lives on the instance, so any number of runs can share one
+    process and one session."""
+
+    def __init__(
+        self,
+        session,
+        tools,
+        system_prompt,
+        query,
+        edit_content=None,
+        llm_executor=None,
+        tool_semaphore=None,
+        mode="text",
+        stream=False,
+        max_parallel_calls=None,
+    ):
+        self.session = session
+        self.tools = tools if isinstance(tools, ToolRegistry) else ToolRegistry(tools)
+        self.system_prompt = system_prompt
+        self.query = query
+        self.edit_content = edit_content
+        # Thread pool for the blocking Gemini client (None: the loop's default)
+        self.llm_executor = llm_executor
+        # Bounds concurrent tool calls across runs (None: unbounded)
+        self.tool_semaphore = tool_semaphore
+        # Tool calls from one LLM turn that may run at the same time
+        if max_parallel_calls is None:
+            max_parallel_calls = int(os.getenv("AGENT_MAX_PARALLEL_CALLS", "4"))
+        self.max_parallel_calls = max(1, max_parallel_calls)
+        # "text": FUNCTION_CALL lines; "function": native Gemini function calling
+        self.mode = mode
+        self.config = None
+        if mode == "function":
+            self.config = self.tools.derived("function_config", function_config)
+        # Text mode only: act on a streamed reply's directives as soon as they are complete
+        self.stream = stream and mode == "text"
+        self.iteration = 0
+        # What later prompts see of earlier steps; bounded by AGENT_CONTEXT_* settings
+        self.context = ConversationContext()
+        self.iteration_response = self.context.entries  # full, unabridged history
+        self.prompt_sizes = []  # estimated prompt tokens per iteration
+        self.last_response = None
+        self.keynote_file_path = None  # Store the path to the created Keynote file
+        self.keynote_file_paths = []  # every deck created, when a turn makes several
+        self.final_answer = None
+        self.error = None  # why the loop stopped early, if it did
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.first_action_s = None  # from the first LLM request to the first directive
+
+    async def call_tool(self, name, arguments):
+        if self.tool_semaphore is None:
+            with tracer.span("tool", tool=name):
+                return await self.session.call_tool(name, arguments=arguments)
+        async with self.tool_semaphore:
+            with tracer.span("tool", tool=name):
+                return await self.session.call_tool(name, arguments=arguments)
+
+    def record_usage(self, response, prompt):
+        self.llm_calls += 1
+        usage = getattr(response, "usage_metadata", None)
+        tokens = getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt)
+        self.prompt_tokens += tokens
+        return tokens
+
+    async def execute_call(self, func_name, arguments):
+        """Call one tool; returns (result text for the context, raw result content)"""
+        print(f"DEBUG: Calling tool {func_name}")
+        result = await self.call_tool(func_name, arguments=arguments)
+        print(f"DEBUG: Raw result: {result}")
+
+        # Get the full result content
+        if hasattr(result, "content"):
+            print(f"DEBUG: Result has content attribute")
+            # Handle multiple content items
+            if isinstance(result.content, list):
+                iteration_result = [
+                    (item.text if hasattr(item, "text") else str(item))
+                    for item in result.content
+                ]
+            else:
+                iteration_result = str(result.content)
+        else:
+            print(f"DEBUG: Result has no content attribute")
+            iteration_result = str(result)
+
+        print(f"DEBUG: Final iteration result: {iteration_result}")
+
+        # Format the response based on result type
+        if isinstance(iteration_result, list):
+            result_str = f"[{', '.join(iteration_result)}]"
+        else:
+            result_str = str(iteration_result)
+
+        return result_str, iteration_result
+
+    async def execute_calls(self, calls):
+        """Run one turn's calls concurrently (at most max_parallel_calls at once) and
+        record their results in the order the model gave them.
+
+        Calls on the same output_path run one after another in the model's order
+        (the server only serializes them, in whatever order they arrive); once one
+        of them fails the rest are skipped. Returns False if any call failed."""
+        slots = asyncio.Semaphore(self.max_parallel_calls)
+        outcomes = [None] * len(calls)
+        groups = {}
+        for index, (_, arguments) in enumerate(calls):
+            output_path = (arguments or {}).get("output_path")
+            key = os.path.abspath(os.path.expanduser(output_path)) if output_path else index
+            groups.setdefault(key, []).append(index)
+
+        async def run_group(indexes):
+            for position, index in enumerate(indexes):
+                func_name, arguments = calls[index]
+                async with slots:
+                    try:
+                        outcomes[index] = await self.execute_call(func_name, arguments)
                     except Exception as e:
-                        print(f"Failed to get LLM response: {e}")
+                        outcomes[index] = e
+                if isinstance(outcomes[index], Exception):
+                    for later in indexes[position + 1 :]:
+                        outcomes[later] = RuntimeError(
+                            f"skipped: an earlier {func_name} call on the same "
+                            "output_path failed"
+                        )
+                    return
+
+        if len(calls) > 1:
+            print(f"Dispatching {len(calls)} tool calls on {len(groups)} documents in parallel")
+        await asyncio.gather(*(run_group(indexes) for indexes in groups.values()))
+        ok = True
+        for (func_name, arguments), outcome in zip(calls, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"DEBUG: Error details: {str(outcome)}")
+                print(f"DEBUG: Error type: {type(outcome)}")
+                self.context.add(
+                    f"Error in iteration {self.iteration + 1} calling {func_name}: {str(outcome)}",
+                    f"{func_name} failed: {shorten(str(outcome), 80)}",
+                )
+                self.error = f"{func_name} failed: {outcome}"
+                ok = False
+                continue
+            result_str, iteration_result = outcome
+
+            # Store the file paths created in the first iteration;
+            # the server picks a unique path per request and reports it
+            match = SAVED_PATH_PATTERN.search(result_str)
+            creates = self.iteration == 0 and func_name in (
+                "create_keynote_with_text",
+                "create_presentation_from_outline",
+            )
+            if creates and match:
+                self.keynote_file_paths.append(match.group(1))
+                if self.keynote_file_path is None:
+                    self.keynote_file_path = match.group(1)
+            elif creates and "saved to" in result_str:
+                print(f"WARNING: no deck path found in the result of {func_name}")
+
+            self.context.add(
+                f"In iteration {self.iteration + 1}, you called {func_name} with {arguments} parameters, "
+                f"and the function returned {result_str}.",
+                f"{func_name} -> "
+                + (f"saved {match.group(1)}" if match else shorten(result_str, 80)),
+            )
+            self.last_response = iteration_result
+        return ok
+
+    async def ask(self, prompt):
+        """Get the model's next move as (response_text, calls).
+
+        calls holds typed (name, arguments) pairs in function mode and is None in
+        text mode, where response_text holds the directive lines to act on."""
+        if self.stream:
+            with tracer.span("llm", stream=True):
+                response_text = await stream_directive(
+                    get_client(), prompt, executor=self.llm_executor
+                )
+            self.record_usage(None, prompt)
+            print(f"LLM Directive: {response_text}")
+            return response_text, None
+
+        with tracer.span("llm", stream=False) as span:
+            response = await generate_with_timeout(
+                get_client(), prompt, executor=self.llm_executor, config=self.config
+            )
+            span["prompt_tokens"] = self.record_usage(response, prompt)
+        response_text = (response.text or "").strip()
+        print(f"LLM Response: {response_text}")
+
+        if self.mode == "function":
+            calls = function_calls(response)
+            if not calls:
+                response_text = f"FINAL_ANSWER: {response_text}"
+            return response_text, calls
+
+        # Keep every FUNCTION_CALL line, or else the first FINAL_ANSWER line
+        lines = [line.strip() for line in response_text.split("\n")]
+        function_lines = [line for line in lines if line.startswith("FUNCTION_CALL:")]
+        if function_lines:
+            return "\n".join(function_lines), None
+        for line in lines:
+            if line.startswith("FINAL_ANSWER:"):
+                return line, None
+        return response_text, None
+
+    def parse_text_response(self, response_text):
+        """Turn FUNCTION_CALL lines into [(name, typed arguments)], in order"""
+        return [self.parse_function_line(line) for line in response_text.split("\n")]
+
+    def parse_function_line(self, line):
+        _, function_info = line.split(":", 1)
+        parts = [p.strip() for p in function_info.split("|")]
+        func_name, params = parts[0], parts[1:]
+        print("Step:6 - Found FUNCTION_CALL and Parameters")
+        print(f"\nDEBUG: Function name: {func_name}")
+        print(f"DEBUG: Raw parameters: {params}")
+
+        # Convert with the coercer compiled from the tool's input schema
+        arguments = self.tools.coerce(func_name, params)
+        print("Step:7 - Converted all parameters to proper types")
+        print(f"DEBUG: Final arguments: {arguments}")
+        return func_name, arguments
+
+    async def run(self):
+        """Run the agent loop for this query.
+
+        Returns a summary dict with the final answer (if any), the last tool result
+        and the path of the Keynote file that was created."""
+        # One trace per query: every span of the loop below is a child of this one
+        with tracer.span("query", mode=self.mode, stream=self.stream) as span:
+            result = await self.loop()
+            span["llm_calls"] = self.llm_calls
+            span["prompt_tokens"] = self.prompt_tokens
+        return result
+
+    async def loop(self):
+        while self.iteration < max_iterations:
+            print(f"\n--- Iteration {self.iteration + 1} ---")
+
+            if self.iteration == 0:
+                # First iteration: Create a presentation
+                current_query = self.query
+            elif self.iteration == 1:
+                # Second iteration: Edit the presentation
+                current_query = f"Now edit the presentation with this content: {self.edit_content}"
+
+            # Add previous responses to the context
+            if self.iteration_response:
+                current_query = current_query + "\n\n" + self.context.render()
+
+            # Get model's response with timeout
+            print("Preparing to generate LLM response...")
+            prompt = f"{self.system_prompt}\n\nQuery: {current_query}"
+            self.prompt_sizes.append(estimate_tokens(prompt))
+            print(
+                f"Prompt size: ~{self.prompt_sizes[-1]} tokens "
+                f"({len(self.iteration_response)} earlier steps)"
+            )
+            requested = time.perf_counter()
+            try:
+                response_text, calls = await self.ask(prompt)
+            except Exception as e:
+                print(f"Failed to get LLM response: {e}")
+                self.error = f"LLM request failed: {e}"
+                break
+
+            if self.first_action_s is None and (
+                calls or response_text.startswith(("FUNCTION_CALL:", "FINAL_ANSWER:"))
+            ):
+                self.first_action_s = time.perf_counter() - requested
+                print(f"Time to first action: {self.first_action_s:.3f}s")
+
+            if calls or response_text.startswith("FUNCTION_CALL:"):
+                try:
+                    if not calls:
+                        with tracer.span("coercion"):
+                            calls = self.parse_text_response(response_text)
+                    if not await self.execute_calls(calls):
                         break
 
-                    if response_text.startswith("FUNCTION_CALL:"):
-                        _, function_info = response_text.split(":", 1)
-                        parts = [p.strip() for p in function_info.split("|")]
-                        func_name, params = parts[0], parts[1:]
-                        print("Step:6 - Found FUNCTION_CALL and Parameters")
-                        print(f"\nDEBUG: Function name: {func_name}")
-                        print(f"DEBUG: Raw parameters: {params}")
-
-                        try:
-                            # Find the matching tool to get its input schema
-                            tool = next((t for t in tools if t.name == func_name), None)
-                            if not tool:
-                                print(
-                                    f"DEBUG: Available tools: {[t.name for t in tools]}"
-                                )
-                                raise ValueError(f"Unknown tool: {func_name}")
-
-                            print(f"DEBUG: Found tool: {tool.name}")
-                            print(f"DEBUG: Tool schema: {tool.inputSchema}")
-
-                            # Prepare arguments according to the tool's input schema
-                            arguments = {}
-                            schema_properties = tool.inputSchema.get("properties", {})
-                            print(f"DEBUG: Schema properties: {schema_properties}")
-
-                            for param_name, param_info in schema_properties.items():
-                                if not params:  # Check if we have enough parameters
-                                    break  # Some parameters might be optional
-
-                                value = params.pop(
-                                    0
-                                )  # Get and remove the first parameter
-                                param_type = param_info.get("type", "string")
-
-                                print(
-                                    f"DEBUG: Converting parameter {param_name} with value {value} to type {param_type}"
-                                )
-
-                                # Convert the value to the correct type based on the schema
-                                if param_type == "integer":
-                                    arguments[param_name] = int(value)
-                                elif param_type == "number":
-                                    arguments[param_name] = float(value)
-                                elif param_type == "array":
-                                    # Handle array input - this is for the slides_data parameter
-                                    import json
-
-                                    if isinstance(value, str):
-                                        try:
-                                            # Try to parse as JSON
-                                            arguments[param_name] = json.loads(value)
-                                        except:
-                                            # If not valid JSON, try to evaluate as Python literal
-                                            import ast
-
-                                            arguments[param_name] = ast.literal_eval(
-                                                value
-                                            )
-                                else:
-                                    arguments[param_name] = str(value)
+                except Exception as e:
+                    print(f"DEBUG: Error details: {str(e)}")
+                    print(f"DEBUG: Error type: {type(e)}")
+                    import traceback
+
+                    traceback.print_exc()
+                    self.context.add(f"Error in iteration {self.iteration + 1}: {str(e)}")
+                    self.error = str(e)
+                    break
+
+            elif response_text.startswith("FINAL_ANSWER:"):
+                print("\n=== Agent Execution Complete ===")
+                print(f"Final answer: {response_text}")
+                self.final_answer = response_text.split(":", 1)[1].strip()
+                break
+
+            self.iteration += 1
+
+        return {
+            "query": self.query,
+            "final_answer": self.final_answer,
+            "error": self.error,
+            "last_response": self.last_response,
+            "keynote_file_path": self.keynote_file_path,
+            "keynote_file_paths": self.keynote_file_paths,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "first_action_s": self.first_action_s,
+            "prompt_sizes": self.prompt_sizes,
+        }
+
+
+async def run_query(
+    session, tools, system_prompt, query, edit_content=None, mode="text", stream=False
+):
+    """Run the agent loop for one query over an already initialized session."""
+    return await AgentRun(
+        session, tools, system_prompt, query, edit_content, mode=mode, stream=stream
+    ).run()
+
+
+def server_parameters():
+    # Pass our environment through so KEYNOTE_* server settings apply to the child;
+    # the server lives next to this file, whatever the working directory
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_server.py")],
+        env=dict(os.environ),
+    )
 
-                            # Handle any remaining parameters as optiona                l
-                            print("Step:7 - Converted all parameters to proper types")
-                            print(f"DEBUG: Final arguments: {arguments}")
-                            print(f"DEBUG: Calling tool {func_name}")
 
-                            result = await session.call_tool(
-                                func_name, arguments=arguments
-                            )
-                            print(f"DEBUG: Raw result: {result}")
-
-                            # Get the full result content
-                            if hasattr(result, "content"):
-                                print(f"DEBUG: Result has content attribute")
-                                # Handle multiple content items
-                                if isinstance(result.content, list):
-                                    iteration_result = [
-                                        (
-                                            item.text
-                                            if hasattr(item, "text")
-                                            else str(item)
-                                        )
-                                        for item in result.content
-                                    ]
-                                else:
-                                    iteration_result = str(result.content)
-                            else:
-                                print(f"DEBUG: Result has no content attribute")
-                                iteration_result = str(result)
-
-                            print(f"DEBUG: Final iteration result: {iteration_result}")
-
-                            # Format the response based on result type
-                            if isinstance(iteration_result, list):
-                                result_str = f"[{', '.join(iteration_result)}]"
-                            else:
-                                result_str = str(iteration_result)
-
-                            # Store the file path if this is the first iteration
-                            if (
-                                iteration == 0
-                                and func_name == "create_keynote_with_text"
-                            ):
-                                user_home = os.path.expanduser("~")
-                                keynote_file_path = f"{user_home}/Desktop/my_new.key"
-
-                            iteration_response.append(
-                                f"In iteration {iteration + 1}, you called {func_name} with {arguments} parameters, "
-                                f"and the function returned {result_str}."
-                            )
-                            last_response = iteration_result
+@asynccontextmanager
+async def http_client(url):
+    """A shared server over streamable HTTP (mcp_server.py http), as (read, write)."""
+    from mcp.client.streamable_http import streamable_http_client
 
-                        except Exception as e:
-                            print(f"DEBUG: Error details: {str(e)}")
-                            print(f"DEBUG: Error type: {type(e)}")
-                            import traceback
+    async with streamable_http_client(url) as (read, write, _):
+        yield read, write
 
-                            traceback.print_exc()
-                            iteration_response.append(
-                                f"Error in iteration {iteration + 1}: {str(e)}"
-                            )
-                            break
 
-                    elif response_text.startswith("FINAL_ANSWER:"):
-                        print("\n=== Agent Execution Complete ===")
-                        print(f"Final answer: {response_text}")
-                        break
+def connect_server():
+    """Transport to the MCP server: the shared one at AGENT_SERVER_URL, a pre-warmed
+    one handed out by warm_server.py when AGENT_SERVER_SOCKET names its socket, else
+    a fresh child process over stdio."""
+    server_url = os.getenv("AGENT_SERVER_URL")
+    if server_url:
+        return http_client(server_url)
+    socket_path = os.getenv("AGENT_SERVER_SOCKET")
+    if socket_path:
+        from warm_server import socket_client
 
-                    iteration += 1
+        return socket_client(socket_path)
+    return stdio_client(server_parameters())
+
+
+async def main(mode="text", stream=False):
+    print("Starting main execution...")
+    try:
+        # Create a single MCP server connection
+        print("Establishing connection to MCP server...")
+        async with connect_server() as (read, write):
+            print("Step:1 - Connection established, creating session...")
+            async with ClientSession(read, write) as session:
+                tools, system_prompt = await connect_and_prepare(session, mode)
+
+                # Define the presentation topic and edit content
+                presentation_topic = "Artificial Intelligence"
+                edit_content = "Add a slide about Machine Learning applications"
+
+                # Initial query for creating a presentation
+                query = f"Create a Keynote presentation about {presentation_topic}"
+                await run_query(
+                    session,
+                    tools,
+                    system_prompt,
+                    query,
+                    edit_content,
+                    mode=mode,
+                    stream=stream,
+                )
 
     except Exception as e:
         print(f"Error in main execution: {e}")
         import traceback
 
         traceback.print_exc()
+
+
+async def serve_stdin(answer):
+    """Answer one query per stdin line; each result is printed as a RESULT: JSON line"""
+    loop = asyncio.get_running_loop()
+    print("Daemon ready, reading queries from stdin (one per line)")
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        query = line.strip()
+        if query:
+            print(f"RESULT: {json.dumps(await answer(query))}", flush=True)
+
+
+async def serve_socket(socket_path, answer):
+    """Answer one query per line received on a Unix socket, replying with a JSON line"""
+
+    async def handle(reader, writer):
+        try:
+            while line := await reader.readline():
+                query = line.decode("utf-8").strip()
+                if query:
+                    writer.write((json.dumps(await answer(query)) + "\n").encode("utf-8"))
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    print(f"Daemon ready, listening on {socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
     finally:
-        reset_state()  # Reset at the end of main
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+async def serve(socket_path=None, mode="text", stream=False):
+    """Keep one MCP session open and answer many queries over it.
+
+    Interpreter startup, the MCP handshake, list_tools and the system prompt are paid
+    once; each query then only costs its LLM and tool calls."""
+    print("Establishing connection to MCP server...")
+    async with connect_server() as (read, write):
+        print("Step:1 - Connection established, creating session...")
+        async with ClientSession(read, write) as session:
+            tools, system_prompt = await connect_and_prepare(session, mode)
+
+            async def answer(query):
+                try:
+                    return await run_query(
+                        session, tools, system_prompt, query, mode=mode, stream=stream
+                    )
+                except Exception as e:
+                    print(f"Error answering query: {e}")
+                    return {"query": query, "error": str(e)}
+
+            if socket_path:
+                await serve_socket(socket_path, answer)
+            else:
+                await serve_stdin(answer)
+
+
+def read_topics(topics_path):
+    """One presentation topic per line; blank lines and # comments are skipped"""
+    with open(topics_path) as f:
+        return [
+            line.strip()
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+async def run_batch(
+    topics_path,
+    output_path,
+    concurrency=4,
+    llm_workers=None,
+    tool_concurrency=None,
+    mode="text",
+    stream=False,
+):
+    """Create one presentation per topic, running up to `concurrency` topics at once.
+
+    Every topic is an independent AgentRun over one shared MCP session. LLM calls go
+    to a dedicated, bounded thread pool and tool calls are throttled separately.
+    Results are appended to output_path as JSON lines as soon as each topic ends."""
+    topics = read_topics(topics_path)
+    print(f"Batch: {len(topics)} topics, concurrency {concurrency}")
+    llm_executor = ThreadPoolExecutor(
+        max_workers=llm_workers or concurrency, thread_name_prefix="llm"
+    )
+    tool_semaphore = asyncio.Semaphore(tool_concurrency or concurrency)
+    run_slots = asyncio.Semaphore(concurrency)
+    batch_start = time.perf_counter()
+    try:
+        async with connect_server() as (read, write):
+            async with ClientSession(read, write) as session:
+                tools, system_prompt = await connect_and_prepare(session, mode)
+
+                with open(output_path, "w") as output:
+
+                    async def run_topic(index, topic):
+                        async with run_slots:
+                            start = time.perf_counter()
+                            run = AgentRun(
+                                session,
+                                tools,
+                                system_prompt,
+                                f"Create a Keynote presentation about {topic}",
+                                llm_executor=llm_executor,
+                                tool_semaphore=tool_semaphore,
+                                mode=mode,
+                                stream=stream,
+                            )
+                            try:
+                                result = await run.run()
+                                if result["error"]:
+                                    result["status"] = "error"
+                                elif not (
+                                    result["keynote_file_path"] or result["final_answer"]
+                                ):
+                                    result["status"] = "incomplete"
+                                else:
+                                    result["status"] = "ok"
+                            except Exception as e:
+                                print(f"Error in batch topic {topic!r}: {e}")
+                                result = {
+                                    "query": run.query,
+                                    "status": "error",
+                                    "error": str(e),
+                                }
+                            result.update(
+                                index=index,
+                                topic=topic,
+                                elapsed_s=round(time.perf_counter() - start, 3),
+                            )
+                            output.write(json.dumps(result, default=str) + "\n")
+                            output.flush()
+
+                    await asyncio.gather(
+                        *(run_topic(i, topic) for i, topic in enumerate(topics))
+                    )
+    finally:
+        llm_executor.shutdown(wait=False)
+
+    elapsed = time.perf_counter() - batch_start
+    print(
+        f"Batch complete: {len(topics)} topics in {elapsed:.1f}s "
+        f"({len(topics) / elapsed * 60:.1f} decks/min), results in {output_path}"
+    )
+    print(f"LLM calls: {json.dumps(llm_controller.stats())}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Keynote presentation agent")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep one MCP session open and answer queries from stdin",
+    )
+    parser.add_argument(
+        "--socket", help="with --daemon, read queries from this Unix socket instead"
+    )
+    parser.add_argument("--batch", help="file with one presentation topic per line")
+    parser.add_argument(
+        "--output", default="batch_results.jsonl", help="JSONL results file for --batch"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="topics processed at once in --batch"
+    )
+    parser.add_argument(
+        "--llm-workers", type=int, help="threads for LLM calls (default: --concurrency)"
+    )
+    parser.add_argument(
+        "--tool-concurrency",
+        type=int,
+        help="concurrent tool calls (default: --concurrency)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("text", "function"),
+        default="text",
+        help="text: FUNCTION_CALL lines; function: native Gemini function calling",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="text mode: act on the first complete directive while the reply streams",
+    )
+    parser.add_argument(
+        "--server-socket",
+        help="use a pre-warmed MCP server from warm_server.py listening on this socket",
+    )
+    parser.add_argument(
+        "--server-url",
+        help="use a shared MCP server over HTTP, e.g. http://127.0.0.1:8000/mcp",
+    )
+    cli_args = parser.parse_args()
+    if cli_args.server_socket:
+        os.environ["AGENT_SERVER_SOCKET"] = cli_args.server_socket
+    if cli_args.server_url:
+        os.environ["AGENT_SERVER_URL"] = cli_args.server_url
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("ERROR: GOOGLE_API_KEY environment variable is not set!")
+        print(
+            "Please create a .env file with your GOOGLE_API_KEY or set it in your environment."
+        )
+        sys.exit(1)
+    if cli_args.batch:
+        asyncio.run(
+            run_batch(
+                cli_args.batch,
+                cli_args.output,
+                concurrency=cli_args.concurrency,
+                llm_workers=cli_args.llm_workers,
+                tool_concurrency=cli_args.tool_concurrency,
+                mode=cli_args.mode,
+                stream=cli_args.stream,
+            )
+        )
+    elif cli_args.daemon or cli_args.socket:
+        asyncio.run(serve(cli_args.socket, cli_args.mode, cli_args.stream))
+    else:
+        asyncio.run(main(cli_args.mode, cli_args.stream))
@@ -1,69 +1,377 @@
-def get_create_keynote_prompt(text="Apple", width=540, height=430):
-    return f"""
-tell application "Keynote"
-    -- Open Keynote and create a new presentation
-    activate
-    delay 2
-    
-    -- Create a new presentation
-    make new document
-    delay 2
-    
-    -- Get a reference to the first slide
-    tell front document
-        tell the current slide
-            -- Create a new shape (rectangle)
-            set newShape to make new shape
-            
-            -- Set shape properties - using simple
-            set the width of newShape to {width}
-            set the height of newShape to {height}
-            
-            -- Center the shape on the slide
-            set the position of newShape to {{400,540}} 
-            
-            -- Add text to the shape
-            set the object text of newShape to "{text}"
-            
-            -- Format the text
-            tell the object text of newShape
-                set the font to "Helvetica"
-                set the size to 72
-                set the alignment to center
-            end tell
+# AppleScript templates. Each template is fixed source that gets compiled once by
+# script_templates.py; per-call values arrive through `on run argv`, so they are
+# never spliced into the source.
+
+from slide_model import encode_slide_args, encode_slides_args
+
+# Readiness-polling handlers shared by every template. Instead of sleeping for a
+# fixed time, templates call `my wait_for(condition, target)`, which polls the real
+# application state every poll interval until it holds or the timeout expires, and
+# logs how long it actually waited. Templates finish with `return my wait_report()`
+# so the caller can see the per-wait timings (see readiness.parse_wait_report).
+READINESS_HANDLERS = """
+use AppleScript version "2.4"
+use framework "Foundation"
+use scripting additions
+
+property pollInterval : %(poll_interval)s
+property waitTimeout : %(wait_timeout)s
+property waitLog : {}
+
+on clock()
+    return (current application's NSDate's timeIntervalSinceReferenceDate()) as real
+end clock
+
+on reset_waits()
+    set waitLog to {}
+end reset_waits
+
+on is_ready(conditionName, target)
+    if conditionName is "keynote_running" then
+        return application "Keynote" is running
+    else if conditionName is "document_ready" then
+        tell application "Keynote"
+            if target is missing value then
+                if not (exists front document) then return false
+                set target to front document
+            end if
+            return exists current slide of target
+        end tell
+    else if conditionName is "path_exists" then
+        set fileManager to current application's NSFileManager's defaultManager()
+        return (fileManager's fileExistsAtPath:target) as boolean
+    else if conditionName is "file_written" then
+        set fileManager to current application's NSFileManager's defaultManager()
+        if not ((fileManager's fileExistsAtPath:target) as boolean) then return false
+        set attributes to fileManager's attributesOfItemAtPath:target |error|:(missing value)
+        return ((attributes's fileSize()) as integer) > 0
+    end if
+    error "Unknown readiness condition: " & conditionName
+end is_ready
+
+on wait_for(conditionName, target)
+    set startedAt to my clock()
+    repeat
+        try
+            if my is_ready(conditionName, target) then exit repeat
+        on error errorMessage number errorNumber
+            -- Unknown conditions are programming errors; anything else means "not yet".
+            if errorMessage starts with "Unknown readiness condition" then error errorMessage number errorNumber
+        end try
+        if (my clock()) - startedAt > waitTimeout then
+            error "Timed out after " & waitTimeout & "s waiting for " & conditionName number 9001
+        end if
+        delay pollInterval
+    end repeat
+    set waitedMs to round (((my clock()) - startedAt) * 1000)
+    set end of waitLog to conditionName & "=" & (waitedMs as integer)
+end wait_for
+
+on wait_report()
+    set previousDelimiters to AppleScript's text item delimiters
+    set AppleScript's text item delimiters to ","
+    set report to "WAITS:" & (waitLog as text)
+    set AppleScript's text item delimiters to previousDelimiters
+    return report
+end wait_report
+"""
+
+# Deck-building handlers shared by every template, next to the readiness handlers.
+DECK_HANDLERS = """
+-- Save a document in place and optionally export it, all in the same session
+on save_and_export(targetDocument, outputPath, exportFormat, exportPath)
+    tell application "Keynote"
+        -- Save straight to the requested path, no save dialog involved
+        save targetDocument in (outputPath as POSIX file)
+        my wait_for("file_written", outputPath)
+
+        -- Optional export in the same session
+        if exportFormat is "pdf" then
+            export targetDocument to (exportPath as POSIX file) as PDF
+            my wait_for("file_written", exportPath)
+        else if exportFormat is "png" then
+            export targetDocument to (exportPath as POSIX file) as slide images with properties {image format:PNG}
+            my wait_for("path_exists", exportPath)
+        end if
+    end tell
+end save_and_export
+
+-- Append a slide using the title & bullets layout when the theme has one
+on add_slide(targetDocument)
+    tell application "Keynote"
+        tell targetDocument
+            try
+                return make new slide with properties {base slide:master slide "Title & Bullets"}
+            on error
+                return make new slide
+            end try
+        end tell
+    end tell
+end add_slide
+
+-- Fill a slide from the argument stream starting at cursor (see
+-- slide_model.encode_slide_args) and return the cursor just past it
+on fill_slide(thisSlide, argv, cursor)
+    set slideTitle to item cursor of argv
+    set slideBody to item (cursor + 1) of argv
+    set shapeCount to (item (cursor + 2) of argv) as integer
+    set cursor to cursor + 3
+    tell application "Keynote"
+        tell thisSlide
+            try
+                set object text of default title item to slideTitle
+            end try
+            try
+                set object text of default body item to slideBody
+            end try
+            repeat shapeCount times
+                set newShape to make new shape
+                set the width of newShape to (item (cursor + 1) of argv) as integer
+                set the height of newShape to (item (cursor + 2) of argv) as integer
+                set the position of newShape to {(item (cursor + 3) of argv) as integer, (item (cursor + 4) of argv) as integer}
+                set the object text of newShape to item cursor of argv
+                set cursor to cursor + 5
+            end repeat
         end tell
     end tell
-end tell
+    return cursor
+end fill_slide
 """
 
-def get_save_keynote_prompt():
-    return """
-tell application "System Events"
-    tell process "Keynote"
-        set frontmost to true
-        
-        -- Press Command+S to open save dialog
-        keystroke "s" using command down
-        delay 1
-        
-        -- Type the file path
-        keystroke "my_new"
-        delay 1
-        
-        -- Press Return to save
-        keystroke return
-        delay 2
-        
-        -- If a file exists dialog appears, press Replace
+CREATE_KEYNOTE_TEMPLATE = """
+on run argv
+    my reset_waits()
+    set shapeText to item 1 of argv
+    set shapeWidth to (item 2 of argv) as integer
+    set shapeHeight to (item 3 of argv) as integer
+    set outputPath to item 4 of argv
+    set exportFormat to item 5 of argv
+    set exportPath to item 6 of argv
+
+    tell application "Keynote"
+        -- Keynote is kept running by keynote_app.py; this only confirms it is up
+        my wait_for("keynote_running", missing value)
+
+        -- Create a new presentation
+        set newDocument to make new document
         try
-            if exists button "Replace" of sheet 1 of window 1 then
-                click button "Replace" of sheet 1 of window 1
-                delay 1
-            end if
+            my wait_for("document_ready", newDocument)
+
+            -- Get a reference to the first slide
+            tell newDocument
+                tell the current slide
+                    -- Create a new shape (rectangle)
+                    set newShape to make new shape
+
+                    -- Set shape properties - using simple
+                    set the width of newShape to shapeWidth
+                    set the height of newShape to shapeHeight
+
+                    -- Center the shape on the slide
+                    set the position of newShape to {400, 540}
+
+                    -- Add text to the shape
+                    set the object text of newShape to shapeText
+
+                    -- Format the text
+                    tell the object text of newShape
+                        set the font to "Helvetica"
+                        set the size to 72
+                        set the alignment to center
+                    end tell
+                end tell
+            end tell
+
+            my save_and_export(newDocument, outputPath, exportFormat, exportPath)
+        on error errorMessage number errorNumber
+            close newDocument saving no
+            error errorMessage number errorNumber
+        end try
+
+        -- Close only the document this script created; Keynote itself stays warm
+        close newDocument saving no
+    end tell
+    return my wait_report()
+end run
+"""
+
+# Whole deck in one execution. argv: output path, export format, export path,
+# then the slide stream from slide_model.encode_slides_args.
+CREATE_OUTLINE_TEMPLATE = """
+on run argv
+    my reset_waits()
+    set outputPath to item 1 of argv
+    set exportFormat to item 2 of argv
+    set exportPath to item 3 of argv
+    set slideCount to (item 4 of argv) as integer
+    set cursor to 5
+
+    tell application "Keynote"
+        my wait_for("keynote_running", missing value)
+
+        set newDocument to make new document
+        try
+            my wait_for("document_ready", newDocument)
+            repeat with slideIndex from 1 to slideCount
+                if slideIndex is 1 then
+                    -- Reuse the slide every new document starts with
+                    set thisSlide to slide 1 of newDocument
+                    try
+                        set base slide of thisSlide to master slide "Title & Bullets" of newDocument
+                    end try
+                else
+                    set thisSlide to my add_slide(newDocument)
+                end if
+                set cursor to my fill_slide(thisSlide, argv, cursor)
+            end repeat
+
+            my save_and_export(newDocument, outputPath, exportFormat, exportPath)
+        on error errorMessage number errorNumber
+            close newDocument saving no
+            error errorMessage number errorNumber
+        end try
+
+        -- Close only the document this script created; Keynote itself stays warm
+        close newDocument saving no
+    end tell
+    return my wait_report()
+end run
+"""
+
+# Import a deck rendered offline (pptx_render) and save it as Keynote in one
+# execution. argv: source path, output path, export format, export path.
+IMPORT_DECK_TEMPLATE = """
+on run argv
+    my reset_waits()
+    set sourcePath to item 1 of argv
+    set outputPath to item 2 of argv
+    set exportFormat to item 3 of argv
+    set exportPath to item 4 of argv
+
+    tell application "Keynote"
+        my wait_for("keynote_running", missing value)
+
+        set newDocument to open (sourcePath as POSIX file)
+        try
+            my wait_for("document_ready", newDocument)
+            my save_and_export(newDocument, outputPath, exportFormat, exportPath)
+        on error errorMessage number errorNumber
+            close newDocument saving no
+            error errorMessage number errorNumber
+        end try
+
+        -- Close only the document this script opened; Keynote itself stays warm
+        close newDocument saving no
+    end tell
+    return my wait_report()
+end run
+"""
+
+# Patch a saved deck in place. argv: deck path, export format, export path, op
+# count, then per op its kind and 1-based position; "insert" ops are followed by
+# the slide's stream (see deck_manifest.diff_slides and slide_model).
+UPDATE_DECK_TEMPLATE = """
+on run argv
+    my reset_waits()
+    set deckPath to item 1 of argv
+    set exportFormat to item 2 of argv
+    set exportPath to item 3 of argv
+    set opCount to (item 4 of argv) as integer
+    set cursor to 5
+
+    tell application "Keynote"
+        my wait_for("keynote_running", missing value)
+
+        set targetDocument to open (deckPath as POSIX file)
+        try
+            my wait_for("document_ready", targetDocument)
+            repeat opCount times
+                set opKind to item cursor of argv
+                set slidePosition to (item (cursor + 1) of argv) as integer
+                set cursor to cursor + 2
+                if opKind is "delete" then
+                    delete slide slidePosition of targetDocument
+                else
+                    set thisSlide to my add_slide(targetDocument)
+                    if slidePosition < (count of slides of targetDocument) then
+                        move thisSlide to before slide slidePosition of targetDocument
+                    end if
+                    set cursor to my fill_slide(thisSlide, argv, cursor)
+                end if
+            end repeat
+
+            my save_and_export(targetDocument, deckPath, exportFormat, exportPath)
+        on error errorMessage number errorNumber
+            close targetDocument saving no
+            error errorMessage number errorNumber
         end try
-        
-        -- Press Command+Q to quit Keynote
-        keystroke "q" using command down
+
+        -- Close only the document this script opened; Keynote itself stays warm
+        close targetDocument saving no
+    end tell
+    return my wait_report()
+end run
+"""
+
+LAUNCH_KEYNOTE_TEMPLATE = """
+on run argv
+    my reset_waits()
+    -- Launch without activating, so no window is brought to the front
+    tell application "Keynote" to launch
+    my wait_for("keynote_running", missing value)
+    return my wait_report()
+end run
+"""
+
+QUIT_KEYNOTE_TEMPLATE = """
+on run argv
+    if application "Keynote" is not running then return "QUIT:not-running"
+    tell application "Keynote"
+        -- Leave Keynote alone while documents we did not create are still open
+        if (count of documents) > 0 then return "QUIT:in-use"
+        quit
     end tell
-end tell
-"""
\ No newline at end of file
+    return "QUIT:done"
+end run
+"""
+
+TEMPLATES = {
+    "create_keynote": CREATE_KEYNOTE_TEMPLATE,
+    "create_outline": CREATE_OUTLINE_TEMPLATE,
+    "import_deck": IMPORT_DECK_TEMPLATE,
+    "update_deck": UPDATE_DECK_TEMPLATE,
+    "launch_keynote": LAUNCH_KEYNOTE_TEMPLATE,
+    "quit_keynote": QUIT_KEYNOTE_TEMPLATE,
+}
+
+EXPORT_FORMATS = ("pdf", "png")
+
+
+def get_readiness_handlers(poll_interval=0.05, wait_timeout=10):
+    return READINESS_HANDLERS % {
+        "poll_interval": float(poll_interval),
+        "wait_timeout": float(wait_timeout),
+    }
+
+
+def get_create_keynote_args(
+    text="Apple", width=540, height=430, output_path="", export_format="", export_path=""
+):
+    return [text, int(width), int(height), output_path, export_format, export_path]
+
+
+def get_create_outline_args(slides, output_path="", export_format="", export_path=""):
+    return [output_path, export_format, export_path] + encode_slides_args(slides)
+
+
+def get_import_deck_args(source_path, output_path="", export_format="", export_path=""):
+    return [source_path, output_path, export_format, export_path]
+
+
+def get_update_deck_args(deck_path, ops, export_format="", export_path=""):
+    args = [deck_path, export_format, export_path, len(ops)]
+    for op in ops:
+        args += [op[0], op[1]]
+        if op[0] == "insert":
+            args += encode_slide_args(op[2])
+    return args
@@ -0,0 +1,251 @@
+"""Content-addressed cache of generated decks.
+
+A deck is addressed by a hash of the tool name, its normalized arguments and the
+version of the script template that builds it. Entries live on disk under
+``KEYNOTE_ARTIFACT_CACHE`` (one directory per key holding the ``.key`` and any
+export), and are evicted least-recently-used first once the cache grows beyond
+``KEYNOTE_ARTIFACT_CACHE_MB``, or when older than ``KEYNOTE_ARTIFACT_CACHE_MAX_AGE``
+seconds. Set ``KEYNOTE_ARTIFACT_CACHE_MB=0`` to disable caching.
+
+The index is shared by every server process using the same root: each change
+re-reads it under an exclusive lock on ``index.lock`` before writing it back, and
+eviction also removes entry directories the index no longer knows about.
+
+Hits are materialized as copies. ``KEYNOTE_ARTIFACT_LINK=1`` hardlinks instead, which
+is faster for large decks but is only safe while nothing edits outputs in place.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "keynotemcp", "artifacts")
+
+# Entries still being written are left alone by the orphan sweep for this long
+STALE_TMP_AGE = 3600
+
+
+def cache_key(tool, arguments, version):
+    payload = json.dumps(
+        {"tool": tool, "arguments": arguments, "version": version},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def path_size(path):
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    return os.path.getsize(path)
+
+
+def remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class ArtifactCache:
+    def __init__(self, root=None, max_bytes=None, max_age=None, link=None):
+        self.root = root or os.getenv("KEYNOTE_ARTIFACT_CACHE", DEFAULT_ROOT)
+        if max_bytes is None:
+            max_mb = float(os.getenv("KEYNOTE_ARTIFACT_CACHE_MB", "500"))
+            max_bytes = int(max_mb * 1024 * 1024)
+        if max_age is None:
+            max_age = float(os.getenv("KEYNOTE_ARTIFACT_CACHE_MAX_AGE", "604800"))
+        if link is None:
+            link = os.getenv("KEYNOTE_ARTIFACT_LINK", "0") == "1"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.orphans_removed = 0
+        self._lock = threading.Lock()
+        self._index = {}
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    @property
+    def _objects_dir(self):
+        return os.path.join(self.root, "objects")
+
+    def _entry_dir(self, key):
+        return os.path.join(self._objects_dir, key)
+
+    def _read_index(self):
+        """The index as on disk, minus entries whose files are gone."""
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        return {
+            key: entry
+            for key, entry in index.items()
+            if os.path.isdir(self._entry_dir(key))
+        }
+
+    @contextmanager
+    def _locked(self):
+        """Hold the cache against other threads and processes, with a fresh index."""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, "index.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._index = self._read_index()
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        tmp_path = f"{self._index_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _materialize(self, source, dest):
+        remove_path(dest)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if os.path.isdir(source):
+            copy = os.link if self.link else shutil.copy2
+            shutil.copytree(source, dest, copy_function=copy)
+        elif self.link:
+            try:
+                os.link(source, dest)
+            except OSError:
+                shutil.copy2(source, dest)
+        else:
+            shutil.copy2(source, dest)
+
+    def get(self, key, outputs):
+        """Materialize a cached entry at ``outputs`` ({role: path}); False on a miss."""
+        if not self.enabled:
+            return False
+        with self._locked():
+            entry = self._index.get(key)
+            now = time.time()
+            if entry is None or now - entry["created"] > self.max_age:
+                self.misses += 1
+                return False
+            sources = {
+                role: os.path.join(self._entry_dir(key), name)
+                for role, name in entry["files"].items()
+            }
+            complete = all(os.path.exists(path) for path in sources.values())
+            if set(sources) != set(outputs) or not complete:
+                self.misses += 1
+                return False
+            for role, dest in outputs.items():
+                self._materialize(sources[role], dest)
+            entry["last_access"] = now
+            self._save()
+            self.hits += 1
+            return True
+
+    def put(self, key, outputs):
+        """Store freshly generated ``outputs`` ({role: path}) under ``key``."""
+        if not self.enabled or not all(os.path.exists(p) for p in outputs.values()):
+            return False
+        # Copy outside the lock; the unique name keeps concurrent puts apart
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_dir)
+        files = {}
+        for role, path in outputs.items():
+            name = role + os.path.splitext(path)[1]
+            target = os.path.join(tmp_dir, name)
+            if os.path.isdir(path):
+                shutil.copytree(path, target)
+            else:
+                shutil.copy2(path, target)
+            files[role] = name
+        with self._locked():
+            remove_path(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+            now = time.time()
+            self._index[key] = {
+                "files": files,
+                "size": path_size(entry_dir),
+                "created": now,
+                "last_access": now,
+            }
+            self.stores += 1
+            self._evict(now)
+            self._save()
+            return True
+
+    def _evict(self, now):
+        for key, entry in list(self._index.items()):
+            if now - entry["created"] > self.max_age:
+                self._drop(key)
+        total = sum(entry["size"] for entry in self._index.values())
+        by_last_access = sorted(self._index.items(), key=lambda item: item[1]["last_access"])
+        for key, entry in by_last_access:
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            self._drop(key)
+        self._sweep(now)
+
+    def _sweep(self, now):
+        """Remove entry directories missing from the index, e.g. left by a crash."""
+        try:
+            names = os.listdir(self._objects_dir)
+        except OSError:
+            return
+        for name in names:
+            if name in self._index:
+                continue
+            path = os.path.join(self._objects_dir, name)
+            try:
+                if name.endswith(".tmp") and now - os.path.getmtime(path) < STALE_TMP_AGE:
+                    continue
+            except OSError:
+                continue
+            remove_path(path)
+            self.orphans_removed += 1
+
+    def _drop(self, key):
+        remove_path(self._entry_dir(key))
+        del self._index[key]
+        self.evictions += 1
+
+    def stats(self):
+        # The index file is replaced atomically, so reading it needs no lock
+        index = self._read_index()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(index),
+                "bytes": sum(entry["size"] for entry in index.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "orphans_removed": self.orphans_removed,
+            }
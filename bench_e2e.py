@@ -0,0 +1,212 @@
+"""End-to-end benchmark of agent.py and mcp_server.py that runs on Linux.
+
+The real agent loop drives the real MCP server over stdio. fake_genai answers for
+Gemini and fake_osascript for Keynote, both with configurable latency. Each
+concurrency level gets a fresh server and runs ``--runs`` queries. The JSON report
+holds throughput, end-to-end latency percentiles and per-stage percentiles:
+
+- client side: query, handshake, llm, coercion, tool;
+- server side: request, render, script, save.
+
+Set AGENT_TRACE and KEYNOTE_TRACE to a file or "stderr" to also get every span.
+
+    python bench_e2e.py --concurrency 1 2 4 8 --runs 32 --output bench_e2e.json
+    python bench_e2e.py --baseline bench_e2e.json   # exit 1 on regressions
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_support import HERE, fake_osascript_environment, tool_text
+from metrics import summarize
+
+
+def configure(args, home):
+    """Environment for the agent and the server it spawns."""
+    settings = fake_osascript_environment(
+        home,
+        FAKE_OSASCRIPT_LATENCY=args.script_latency,
+        FAKE_OSASCRIPT_SAVE_LATENCY=args.save_latency,
+        FAKE_OSASCRIPT_STARTUP=0,
+        FAKE_OSASCRIPT_LOG=os.path.join(home, "osascript.jsonl"),
+        # Every run must do the work, not replay a cache
+        AGENT_LLM_CACHE=0,
+        KEYNOTE_ARTIFACT_CACHE_MB=0,
+        AGENT_LLM_RPM=1000000,
+    )
+    os.environ.update(settings)
+    return settings
+
+
+async def run_level(concurrency, runs, mode, stream):
+    import agent
+    from mcp import ClientSession
+    from mcp.client.stdio import stdio_client
+
+    # The server works on as many documents at once as the agent sends
+    os.environ["KEYNOTE_MAX_CONCURRENCY"] = str(concurrency)
+    os.environ["KEYNOTE_POOL_SIZE"] = str(concurrency)
+    agent.stage_stats.reset()
+    latencies, failures = [], 0
+    async with stdio_client(agent.server_parameters()) as (read, write):
+        async with ClientSession(read, write) as session:
+            tools, system_prompt = await agent.connect_and_prepare(session, mode)
+            slots = asyncio.Semaphore(concurrency)
+
+            async def one(index):
+                nonlocal failures
+                async with slots:
+                    start = time.perf_counter()
+                    result = await agent.AgentRun(
+                        session,
+                        tools,
+                        system_prompt,
+                        f"Create a Keynote presentation about Topic {index}",
+                        mode=mode,
+                        stream=stream,
+                    ).run()
+                    latencies.append(time.perf_counter() - start)
+                    if not result.get("keynote_file_path"):
+                        failures += 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(runs)))
+            wall = time.perf_counter() - start
+            health = json.loads(tool_text(await session.call_tool("keynote_health", {})))
+
+    stages = agent.stage_stats.snapshot()
+    stages.update(health.get("stages", {}))
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "failures": failures,
+        "wall_s": round(wall, 3),
+        "runs_per_s": round(runs / wall, 3),
+        "latency": summarize(latencies),
+        "stages": stages,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(report, baseline, tolerance):
+    """p50 latencies (end-to-end and per stage) that grew beyond tolerance."""
+    found = []
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in report["levels"]:
+        old = previous.get(level["concurrency"])
+        if not old:
+            continue
+        pairs = [("latency", level["latency"], old["latency"])] + [
+            (f"stage {stage}", stats, old["stages"].get(stage, {}))
+            for stage, stats in level["stages"].items()
+        ]
+        for name, new_stats, old_stats in pairs:
+            new_p50, old_p50 = new_stats.get("p50_s"), old_stats.get("p50_s")
+            # Ignore sub-millisecond stages, where noise dominates
+            if new_p50 and old_p50 and old_p50 >= 0.001:
+                if new_p50 > old_p50 * (1 + tolerance):
+                    found.append(
+                        f"concurrency {level['concurrency']} {name}: "
+                        f"p50 {old_p50}s -> {new_p50}s"
+                    )
+        if level["runs_per_s"] < old["runs_per_s"] * (1 - tolerance):
+            found.append(
+                f"concurrency {level['concurrency']} throughput: "
+                f"{old['runs_per_s']} -> {level['runs_per_s']} runs/s"
+            )
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--runs", type=int, default=12, help="queries per level")
+    parser.add_argument("--mode", choices=("text", "function"), default="text")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--slides", type=int, default=5, help="slides per fake deck")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--script-latency", type=float, default=0.2)
+    parser.add_argument("--save-latency", type=float, default=0.1)
+    parser.add_argument("--output", default="bench_e2e.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true", help="show agent output")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    home = tempfile.mkdtemp(prefix="bench-e2e-")
+    settings = configure(args, home)
+
+    import agent
+    import fake_genai
+
+    agent.client = fake_genai.FakeClient(latency=args.llm_latency, slides=args.slides)
+
+    levels = []
+    for concurrency in args.concurrency:
+        quiet = contextlib.redirect_stdout(io.StringIO())
+        with contextlib.nullcontext() if args.verbose else quiet:
+            level = asyncio.run(run_level(concurrency, args.runs, args.mode, args.stream))
+        levels.append(level)
+        print(
+            f"concurrency {concurrency}: {level['runs_per_s']} runs/s, "
+            f"p50 {level['latency']['p50_s']}s, p99 {level['latency']['p99_s']}s, "
+            f"{level['failures']} failures"
+        )
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": {
+            "mode": args.mode,
+            "stream": args.stream,
+            "runs": args.runs,
+            "slides": args.slides,
+            "llm_latency": args.llm_latency,
+            "script_latency": args.script_latency,
+            "save_latency": args.save_latency,
+        },
+        "settings": settings,
+        "levels": levels,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if baseline is not None:
+        found = regressions(report, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
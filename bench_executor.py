@@ -0,0 +1,59 @@
+"""Compare script executor backends.
+
+Runs on Linux against the fake osascript by default:
+
+    python bench_executor.py --scripts 50 --concurrency 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_support import fake_osascript_environment
+from script_executor import BACKENDS, create_executor
+
+SCRIPT = 'tell application "Keynote" to get name'
+
+
+def bench(backend, scripts, concurrency):
+    executor = create_executor(backend)
+    try:
+        executor.run(SCRIPT)  # warm-up, so pool workers are already spawned
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda _: executor.run(SCRIPT), range(scripts)))
+        wall = time.perf_counter() - start
+    finally:
+        executor.close()
+    latencies = sorted(r.elapsed for r in results)
+    return {
+        "backend": backend,
+        "scripts": scripts,
+        "failures": sum(1 for r in results if not r.ok),
+        "wall_s": round(wall, 3),
+        "scripts_per_s": round(scripts / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scripts", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    if "KEYNOTE_OSASCRIPT" not in os.environ and sys.platform != "darwin":
+        os.environ.update(fake_osascript_environment())
+    os.environ.setdefault("KEYNOTE_POOL_SIZE", str(args.concurrency))
+
+    for backend in args.backend or sorted(BACKENDS):
+        print(bench(backend, args.scripts, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
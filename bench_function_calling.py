@@ -0,0 +1,99 @@
+"""Compare FUNCTION_CALL text prompts with native Gemini function calling.
+
+Runs the same topics through both agent modes over one MCP session and reports
+prompt tokens and end-to-end latency per mode. Needs GOOGLE_API_KEY; on Linux the
+Keynote side runs against the fake osascript:
+
+    python bench_function_calling.py --topics topics.txt --repeats 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from bench_support import fake_osascript_environment
+from metrics import percentile
+
+DEFAULT_TOPICS = ["Renewable energy", "The history of jazz", "Remote work best practices"]
+
+
+def use_fake_osascript():
+    for name, value in fake_osascript_environment().items():
+        os.environ.setdefault(name, value)
+
+
+def summarize(mode, runs):
+    latencies = sorted(run["elapsed_s"] for run in runs)
+    return {
+        "mode": mode,
+        "runs": len(runs),
+        "decks": sum(1 for run in runs if run.get("keynote_file_path")),
+        "llm_calls": sum(run.get("llm_calls", 0) for run in runs),
+        "prompt_tokens_mean": round(
+            statistics.mean(run.get("prompt_tokens", 0) for run in runs), 1
+        ),
+        "latency_p50_s": round(percentile(latencies, 0.50), 3),
+        "latency_p95_s": round(percentile(latencies, 0.95), 3),
+    }
+
+
+async def bench(topics, modes, repeats):
+    import agent
+    from mcp import ClientSession
+    from mcp.client.stdio import stdio_client
+
+    # Every run must reach the model, or both modes would measure the cache
+    agent.llm_cache.enabled = False
+    reports = []
+    async with stdio_client(agent.server_parameters()) as (read, write):
+        async with ClientSession(read, write) as session:
+            tools, text_prompt = await agent.connect_and_prepare(session)
+            prompts = {"text": text_prompt, "function": agent.FUNCTION_SYSTEM_PROMPT}
+            for mode in modes:
+                runs = []
+                for _ in range(repeats):
+                    for topic in topics:
+                        start = time.perf_counter()
+                        result = await agent.run_query(
+                            session,
+                            tools,
+                            prompts[mode],
+                            f"Create a Keynote presentation about {topic}",
+                            mode=mode,
+                        )
+                        result["elapsed_s"] = time.perf_counter() - start
+                        runs.append(result)
+                reports.append(summarize(mode, runs))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", help="file with one topic per line")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--mode", action="append", choices=("text", "function"))
+    parser.add_argument("--output", help="also write the reports to this JSON file")
+    args = parser.parse_args()
+
+    if sys.platform != "darwin":
+        use_fake_osascript()
+    topics = DEFAULT_TOPICS
+    if args.topics:
+        from agent import read_topics
+
+        topics = read_topics(args.topics)
+
+    reports = asyncio.run(bench(topics, args.mode or ["text", "function"], args.repeats))
+    for report in reports:
+        print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
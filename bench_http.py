@@ -0,0 +1,234 @@
+"""Load-test the shared streamable HTTP server against the fake script backend.
+
+Starts ``mcp_server.py http`` with fake_osascript standing in for Keynote, then for
+each ``--clients`` level opens that many MCP sessions at once; each session keeps
+``--per-client`` tool calls in flight until it has made ``--requests`` calls.
+Reports requests/sec and latency percentiles per level, the server's HTTP limiter
+stats, and finally checks draining on a second server with slow scripts: SIGTERM while
+calls are running must let them finish.
+
+    python bench_http.py --clients 1 4 16 --requests 20
+    python bench_http.py --clients 8 --output bench_http.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_support import HERE, fake_osascript_environment, tool_text
+from metrics import summarize
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_environment(args, home, port):
+    return dict(
+        os.environ,
+        **fake_osascript_environment(
+            home,
+            FAKE_OSASCRIPT_LATENCY=args.script_latency,
+            FAKE_OSASCRIPT_STARTUP=0,
+            KEYNOTE_ARTIFACT_CACHE_MB=0,
+            KEYNOTE_POOL_SIZE=args.workers,
+            KEYNOTE_MAX_CONCURRENCY=args.workers,
+            KEYNOTE_HTTP_PORT=port,
+            KEYNOTE_HTTP_CLIENT_CONCURRENCY=args.client_limit,
+            KEYNOTE_PREWARM=1,
+        ),
+    )
+
+
+def start_server(env, port, log_path):
+    log = open(log_path, "a")
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "mcp_server.py"), "http"],
+        env=env,
+        stdout=log,
+        stderr=log,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited early; see {log_path}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"Server did not start listening; see {log_path}")
+
+
+async def client_session(url, home, client, requests, per_client, latencies, errors):
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamable_http_client
+
+    async with streamable_http_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            # Like the agent: list once, so call_tool has the output schemas and
+            # does not send a tools/list of its own before returning
+            await session.list_tools()
+            calls = iter(range(requests))
+
+            async def worker():
+                for n in calls:
+                    arguments = {
+                        "text": f"Client {client} request {n}",
+                        "output_path": os.path.join(home, "decks", f"c{client}-{n}.key"),
+                    }
+                    start = time.perf_counter()
+                    try:
+                        result = await session.call_tool(
+                            "create_keynote_with_text", arguments
+                        )
+                        if "saved to" not in tool_text(result):
+                            raise RuntimeError(tool_text(result))
+                        latencies.append(time.perf_counter() - start)
+                    except Exception as e:
+                        errors.append(str(e))
+
+            await asyncio.gather(*(worker() for _ in range(per_client)))
+
+
+async def run_level(url, home, clients, requests, per_client):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            client_session(url, home, c, requests, per_client, latencies, errors)
+            for c in range(clients)
+        )
+    )
+    wall = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "requests": clients * requests,
+        "errors": len(errors),
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(len(latencies) / wall, 2),
+        "latency": summarize(latencies),
+    }
+
+
+async def server_health(url):
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamable_http_client
+
+    async with streamable_http_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            return json.loads(tool_text(await session.call_tool("keynote_health", {})))
+
+
+async def drain_check(url, home, process, calls):
+    """Send SIGTERM while calls are in flight; every one of them should complete."""
+    latencies, errors = [], []
+    task = asyncio.create_task(
+        client_session(url, home, "drain", calls, calls, latencies, errors)
+    )
+    # Wait until the server is running all of them (plus the health call asking)
+    deadline = time.monotonic() + 30
+    while (await server_health(url))["http"]["in_flight"] <= calls:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Drain check calls never reached the server")
+        await asyncio.sleep(0.05)
+    signalled = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    try:
+        await task
+    except Exception as e:
+        errors.append(f"session: {e}")
+    exit_code = await asyncio.to_thread(process.wait, 60)
+    return {
+        "in_flight_calls": calls,
+        "completed": len(latencies),
+        "errors": errors,
+        # uvicorn re-raises the signal once it has shut down cleanly
+        "clean_exit": exit_code in (0, -signal.SIGTERM),
+        "stopped_after_s": round(time.perf_counter() - signalled, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=20, help="calls per client")
+    parser.add_argument(
+        "--per-client", type=int, default=2, help="calls each client keeps in flight"
+    )
+    parser.add_argument(
+        "--client-limit", type=int, default=4, help="server's per-client concurrency"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="script workers")
+    parser.add_argument("--script-latency", type=float, default=0.05)
+    parser.add_argument(
+        "--drain-calls", type=int, default=4, help="calls in flight at SIGTERM (0: skip)"
+    )
+    parser.add_argument("--drain-latency", type=float, default=1.5)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    home = tempfile.mkdtemp(prefix="bench-http-")
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    env = server_environment(args, home, port)
+    log_path = os.path.join(home, "server.log")
+    process = start_server(env, port, log_path)
+
+    report = {"url": url, "server_log": log_path, "levels": []}
+    try:
+        for clients in args.clients:
+            level = asyncio.run(
+                run_level(url, home, clients, args.requests, args.per_client)
+            )
+            report["levels"].append(level)
+            print(
+                f"{clients} clients: {level['requests_per_s']} requests/s, "
+                f"p50 {level['latency'].get('p50_s')}s, "
+                f"p99 {level['latency'].get('p99_s')}s, {level['errors']} errors"
+            )
+        health = asyncio.run(server_health(url))
+        report["http"] = health.get("http")
+        report["stages"] = health.get("stages")
+        print(f"Server HTTP stats: {json.dumps(report['http'])}")
+    finally:
+        process.terminate()
+        process.wait()
+
+    if args.drain_calls:
+        # A server of its own, with scripts slow enough to still be running at SIGTERM
+        port = free_port()
+        env = server_environment(args, home, port)
+        env["FAKE_OSASCRIPT_LATENCY"] = str(args.drain_latency)
+        url = f"http://127.0.0.1:{port}/mcp"
+        process = start_server(env, port, log_path)
+        try:
+            report["drain"] = asyncio.run(
+                drain_check(url, home, process, args.drain_calls)
+            )
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        print(f"Drain: {json.dumps(report['drain'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
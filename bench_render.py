@@ -0,0 +1,62 @@
+"""Measure offline PPTX rendering time against deck size.
+
+Needs no Keynote; time per slide should stay flat as decks grow:
+
+    python bench_render.py --sizes 10 100 1000 5000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from pptx_render import render_pptx
+from slide_model import normalize_slides
+
+
+def sample_deck(slide_count, bullets=5, shapes=1):
+    return normalize_slides(
+        [
+            {
+                "title": f"Slide {n}",
+                "bullets": [f"Point {b} of slide {n}" for b in range(bullets)],
+                "shapes": [{"text": f"Callout {n}.{s}"} for s in range(shapes)],
+            }
+            for n in range(slide_count)
+        ]
+    )
+
+
+def bench(slide_count, repeats):
+    slides = sample_deck(slide_count)
+    path = os.path.join(tempfile.gettempdir(), f"bench-render-{os.getpid()}.pptx")
+    timings = []
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            render_pptx(slides, path)
+            timings.append(time.perf_counter() - start)
+        size = os.path.getsize(path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    best = min(timings)
+    return {
+        "slides": slide_count,
+        "best_s": round(best, 4),
+        "ms_per_slide": round(best / slide_count * 1000, 3),
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    for slide_count in args.sizes:
+        print(bench(slide_count, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Measure startup: import time and time to the first tool call.
+
+- import: ``python -X importtime -c "import <module>"`` for agent and mcp_server,
+  with the slowest imports and a check that modules meant to load on first use
+  (google.genai for the agent, pptx_render for the server) stayed unloaded;
+- first call: from launching an agent process to its first tool result, over a
+  fresh stdio server (cold) and over a pre-warmed one from warm_server.py (warm).
+
+Runs on Linux with fake_osascript standing in for Keynote:
+
+    python bench_startup.py --runs 5
+    python bench_startup.py --max-import-ms agent=900 mcp_server=900  # exit 1 if slower
+"""
+
+import argparse
+import asyncio
+import os
+import queue
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_support import HERE, fake_osascript_environment
+
+# Modules an import of the key must not pull in
+LAZY_MODULES = {"agent": ["google.genai"], "mcp_server": ["pptx_render"]}
+
+PROBE_MARKER = "FIRST_TOOL_CALL"
+
+
+def import_times(module, top=5):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    total = next(cumulative for _, cumulative, name in rows if name == module)
+    loaded = {name for _, _, name in rows}
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "slowest": [
+            (name, round(self_us / 1000, 1))
+            for self_us, _, name in sorted(rows, reverse=True)[:top]
+        ],
+        "eager": [name for name in LAZY_MODULES.get(module, []) if name in loaded],
+    }
+
+
+def probe_environment(home):
+    return dict(
+        os.environ,
+        **fake_osascript_environment(home, FAKE_OSASCRIPT_STARTUP=0, PYTHONPATH=HERE),
+    )
+
+
+async def probe():
+    """Child process: connect like the agent does and make one tool call."""
+    import agent
+    from mcp import ClientSession
+
+    async with agent.connect_server() as (read, write):
+        async with ClientSession(read, write) as session:
+            await agent.connect_and_prepare(session)
+            await session.call_tool("keynote_health", {})
+            elapsed = time.time() - float(os.environ["BENCH_STARTUP_T0"])
+            print(f"{PROBE_MARKER} {elapsed:.4f}", flush=True)
+
+
+def first_call(env):
+    env = dict(env, BENCH_STARTUP_T0=repr(time.time()))
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--probe"],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith(PROBE_MARKER):
+            return float(line.split()[1])
+    raise RuntimeError(f"Probe failed: {completed.stderr[-2000:]}")
+
+
+def cold_runs(env, runs):
+    return [first_call(env) for _ in range(runs)]
+
+
+def warm_runs(env, runs):
+    socket_path = os.path.join(env["HOME"], "warm.sock")
+    launcher = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "warm_server.py"), "--socket", socket_path],
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    ready = queue.Queue()
+
+    def watch():
+        for line in launcher.stderr:
+            if line.startswith("Standby server") and line.rstrip().endswith("ready"):
+                ready.put(line)
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        timings = []
+        for _ in range(runs):
+            # Measure steady state: a standby server is ready when the agent starts
+            ready.get(timeout=60)
+            timings.append(first_call(dict(env, AGENT_SERVER_SOCKET=socket_path)))
+        return timings
+    finally:
+        launcher.terminate()
+        launcher.wait()
+
+
+def summary(timings):
+    return {
+        "median_s": round(statistics.median(timings), 3),
+        "min_s": round(min(timings), 3),
+        "max_s": round(max(timings), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--max-import-ms",
+        nargs="+",
+        default=[],
+        metavar="MODULE=MS",
+        help="fail when importing a module takes longer",
+    )
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        asyncio.run(probe())
+        return
+
+    budgets = {
+        module: float(ms) for module, ms in (item.split("=") for item in args.max_import_ms)
+    }
+    failures = []
+    for module in ("agent", "mcp_server"):
+        report = import_times(module)
+        print(report)
+        if report["eager"]:
+            failures.append(f"{module} imports {', '.join(report['eager'])} eagerly")
+        if module in budgets and report["total_ms"] > budgets[module]:
+            failures.append(
+                f"{module} import took {report['total_ms']}ms, budget {budgets[module]}ms"
+            )
+
+    env = probe_environment(tempfile.mkdtemp(prefix="bench-startup-"))
+    print({"first_tool_call": "cold", **summary(cold_runs(env, args.runs))})
+    print({"first_tool_call": "warm", **summary(warm_runs(env, args.runs))})
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""Helpers shared by the bench_*.py scripts."""
+
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def fake_osascript_environment(home=None, **settings):
+    """Settings that run scripts through fake_osascript.py instead of osascript.
+
+    ``home`` becomes HOME, keeping decks, caches and manifests in a scratch
+    directory; keyword settings (e.g. FAKE_OSASCRIPT_LATENCY=0.05) are added as
+    strings."""
+    fake = f"{sys.executable} {os.path.join(HERE, 'fake_osascript.py')}"
+    env = {"KEYNOTE_OSASCRIPT": fake, "KEYNOTE_OSACOMPILE": f"{fake} --compile"}
+    if home:
+        env["HOME"] = home
+    env.update((name, str(value)) for name, value in settings.items())
+    return env
+
+
+def tool_text(result):
+    """Text of a tool result; dict-returning tools arrive as their JSON encoding."""
+    text = result.content[0].text
+    try:
+        return json.loads(text)["content"][0]["text"]
+    except (ValueError, KeyError, IndexError, TypeError):
+        return text
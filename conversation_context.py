@@ -0,0 +1,70 @@
+"""Bounded conversation context for the agent loop.
+
+Every tool call adds an entry: the full sentence describing the call and its result,
+plus a one-line summary. Prompts include the last ``AGENT_CONTEXT_RECENT`` entries
+verbatim (each shortened to ``AGENT_CONTEXT_RESULT_CHARS``) and only the summaries of
+older ones; if that still exceeds ``AGENT_CONTEXT_MAX_TOKENS``, more entries fall back
+to summaries and the oldest summaries are dropped. Prompt size then stays flat no
+matter how many iterations a run takes.
+"""
+
+import os
+
+from llm_controller import estimate_tokens
+
+
+def shorten(text, limit):
+    """Keep the head and tail of text longer than limit characters; the marker for
+    the omitted middle counts toward the limit."""
+    if len(text) <= limit:
+        return text
+    keep = max(0, limit - len(f" ...[{len(text)} chars omitted]... "))
+    tail = keep // 4
+    omitted = len(text) - keep
+    return (
+        f"{text[: keep - tail]} ...[{omitted} chars omitted]... {text[len(text) - tail :]}"
+    )
+
+
+class ConversationContext:
+    def __init__(self, keep_recent=None, result_chars=None, max_tokens=None):
+        if keep_recent is None:
+            keep_recent = int(os.getenv("AGENT_CONTEXT_RECENT", "4"))
+        if result_chars is None:
+            result_chars = int(os.getenv("AGENT_CONTEXT_RESULT_CHARS", "1000"))
+        if max_tokens is None:
+            max_tokens = int(os.getenv("AGENT_CONTEXT_MAX_TOKENS", "2000"))
+        self.keep_recent = max(1, keep_recent)
+        self.result_chars = result_chars
+        self.max_tokens = max_tokens
+        self.entries = []  # full text, in order
+        self.summaries = []
+
+    def add(self, entry, summary=None):
+        self.entries.append(entry)
+        self.summaries.append(summary or shorten(entry, 120))
+
+    def render(self):
+        """The context text to append to the next prompt."""
+        if not self.entries:
+            return ""
+        verbatim = min(self.keep_recent, len(self.entries))
+        dropped = 0
+        while True:
+            split = len(self.entries) - verbatim
+            older = self.summaries[dropped:split]
+            parts = []
+            if dropped:
+                parts.append(f"({dropped} earlier steps omitted)")
+            if older:
+                parts.append("Earlier steps: " + "; ".join(older) + ".")
+            parts += [shorten(entry, self.result_chars) for entry in self.entries[split:]]
+            text = " ".join(parts)
+            if estimate_tokens(text) <= self.max_tokens:
+                return text
+            if verbatim > 1:
+                verbatim -= 1
+            elif dropped < split:
+                dropped += 1
+            else:
+                return shorten(text, self.max_tokens * 4)
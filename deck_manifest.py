@@ -0,0 +1,100 @@
+"""Manifests of generated decks, for incremental updates.
+
+After a deck is built or updated, its normalized slide model is recorded under
+``KEYNOTE_MANIFEST_DIR`` together with the size and mtime of the saved file. A
+manifest is only trusted while the file on disk still matches, so a deck edited by
+hand in Keynote is never patched (update_presentation refuses to touch it).
+
+``diff_slides`` turns the recorded slides and the desired slides into the script
+operations that ``update_deck`` (apple_prompt) applies in order.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "keynotemcp", "manifests")
+
+
+def _slide_key(slide):
+    return json.dumps(slide, sort_keys=True)
+
+
+def diff_slides(old, new):
+    """Operations turning slides ``old`` into ``new``, applied left to right.
+
+    Each operation is ("insert", position, slide) or ("delete", position), with
+    1-based positions in the document as it is at that point. A changed slide is
+    inserted before the old one is deleted, so a deck never runs out of slides."""
+    matcher = difflib.SequenceMatcher(
+        a=[_slide_key(s) for s in old], b=[_slide_key(s) for s in new], autojunk=False
+    )
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        # Everything before j1 already matches new[:j1]
+        changed = min(i2 - i1, j2 - j1)
+        for t in range(changed):
+            ops.append(("insert", j1 + t + 1, new[j1 + t]))
+            ops.append(("delete", j1 + t + 2))
+        for t in range(changed, j2 - j1):
+            ops.append(("insert", j1 + t + 1, new[j1 + t]))
+        for _ in range(changed, i2 - i1):
+            ops.append(("delete", j2 + 1))
+    return ops
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ManifestStore:
+    def __init__(self, root=None):
+        self.root = root or os.getenv("KEYNOTE_MANIFEST_DIR", DEFAULT_ROOT)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    def _path(self, deck_path):
+        digest = hashlib.sha256(os.path.abspath(deck_path).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{digest[:32]}.json")
+
+    def get(self, deck_path):
+        """The slides recorded for deck_path, or None if unknown or out of date."""
+        try:
+            with open(self._path(deck_path)) as f:
+                manifest = json.load(f)
+            current = _file_signature(deck_path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            if manifest.get("signature") != current:
+                self.stale += 1
+                return None
+            self.hits += 1
+        return manifest["slides"]
+
+    def put(self, deck_path, slides):
+        """Record slides for the deck just saved at deck_path."""
+        manifest = {
+            "deck": os.path.abspath(deck_path),
+            "signature": _file_signature(deck_path),
+            "slides": slides,
+        }
+        path = self._path(deck_path)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale}
@@ -0,0 +1,52 @@
+"""Incremental parsing of agent directives from a streamed LLM response.
+
+The model answers with lines starting ``FUNCTION_CALL:`` or ``FINAL_ANSWER:``. Chunks
+are fed in as they arrive; each chunk is scanned once for line breaks and only the
+unfinished tail of the current line is kept, so a directive is available the moment
+its line ends, without re-scanning the text received so far. ``feed_lines`` returns
+every completed line, for callers that also need to see the lines in between.
+"""
+
+DIRECTIVE_PREFIXES = ("FUNCTION_CALL:", "FINAL_ANSWER:")
+
+
+class DirectiveParser:
+    def __init__(self, prefixes=DIRECTIVE_PREFIXES):
+        self.prefixes = prefixes
+        self.lines = 0
+        self._partial = []  # pieces of the line currently being received
+
+    def feed_lines(self, chunk):
+        """Consume a chunk and return the lines it completed, stripped."""
+        lines = []
+        start = 0
+        while (end := chunk.find("\n", start)) >= 0:
+            self._partial.append(chunk[start:end])
+            start = end + 1
+            lines.append(self._end_line())
+        if start < len(chunk):
+            self._partial.append(chunk[start:])
+        return lines
+
+    def feed(self, chunk):
+        """Consume a chunk and return the directive lines it completed."""
+        return [line for line in self.feed_lines(chunk) if self.is_directive(line)]
+
+    def finish_lines(self):
+        """End of stream: the last line, if it had no newline."""
+        if not self._partial:
+            return []
+        return [self._end_line()]
+
+    def finish(self):
+        """End of stream: the last line may be a directive without a newline."""
+        return [line for line in self.finish_lines() if self.is_directive(line)]
+
+    def is_directive(self, line):
+        return line.startswith(self.prefixes)
+
+    def _end_line(self):
+        line = "".join(self._partial).strip()
+        self._partial = []
+        self.lines += 1
+        return line
@@ -0,0 +1,104 @@
+"""Scripted stand-in for the Gemini client, for benchmarks on machines without a key.
+
+Assign it before running the agent:
+
+    import agent, fake_genai
+    agent.client = fake_genai.FakeClient(latency=0.3)
+
+By default the first turn of a query answers with one call building a deck about the
+query's topic (a FUNCTION_CALL line, or a native function call when the request
+carries function declarations), and any later turn answers FINAL_ANSWER. Pass
+``script``, a function ``(prompt, config) -> text or [(name, args)]``, to answer
+differently. Responses are real ``google.genai`` types with usage metadata.
+"""
+
+import json
+import re
+import threading
+import time
+
+from google.genai import types
+
+TOPIC = re.compile(r"presentation about (.+)")
+
+
+def outline_for(topic, slide_count):
+    return [{"title": topic, "bullets": [f"An overview of {topic}"]}] + [
+        {"title": f"{topic}: part {n}", "bullets": [f"Point {b}" for b in range(1, 4)]}
+        for n in range(1, slide_count)
+    ]
+
+
+def default_script(slide_count):
+    def script(prompt, config):
+        if "you called" in prompt:
+            return "FINAL_ANSWER: [Presentation created]"
+        match = TOPIC.search(prompt)
+        topic = match.group(1).strip() if match else "Keynote"
+        slides = outline_for(topic, slide_count)
+        if config is not None and config.tools:
+            return [("create_presentation_from_outline", {"slides": slides})]
+        return f"FUNCTION_CALL: create_presentation_from_outline|{json.dumps(slides)}"
+
+    return script
+
+
+def _response(answer, prompt):
+    if isinstance(answer, str):
+        parts = [types.Part(text=answer)]
+    else:
+        parts = [
+            types.Part(function_call=types.FunctionCall(name=name, args=args))
+            for name, args in answer
+        ]
+    prompt_tokens = max(1, len(prompt) // 4)
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            total_token_count=prompt_tokens + 50,
+        ),
+    )
+
+
+class FakeModels:
+    def __init__(self, script, latency, chunk_latency, chunk_chars):
+        self.script = script
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def _answer(self, contents, config):
+        prompt = str(contents)
+        with self._lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+        return prompt, self.script(prompt, config)
+
+    def generate_content(self, model, contents, config=None):
+        prompt, answer = self._answer(contents, config)
+        time.sleep(self.latency)
+        return _response(answer, prompt)
+
+    def generate_content_stream(self, model, contents, config=None):
+        prompt, answer = self._answer(contents, config)
+        time.sleep(self.latency)
+        if not isinstance(answer, str):
+            yield _response(answer, prompt)
+            return
+        for start in range(0, len(answer), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk_latency)
+            yield _response(answer[start : start + self.chunk_chars], prompt)
+
+
+class FakeClient:
+    def __init__(
+        self, script=None, latency=0.3, chunk_latency=0.02, chunk_chars=64, slides=5
+    ):
+        self.models = FakeModels(
+            script or default_script(slides), latency, chunk_latency, chunk_chars
+        )
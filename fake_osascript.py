@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""Stand-in for osascript so the script execution path can run on Linux.
+
+Use it by pointing the executor at it:
+
+    KEYNOTE_OSASCRIPT="python fake_osascript.py" python mcp_server.py
+
+It accepts the same command lines the executors use:
+
+- ``fake_osascript.py [-l lang] [-e stmt]... [file | -] [args...]`` runs one script.
+- ``fake_osascript.py -l JavaScript -e <worker source>`` speaks the pool worker protocol.
+- ``fake_osascript.py --compile -o out.scpt [file]`` stands in for osacompile
+  (``KEYNOTE_OSACOMPILE="python fake_osascript.py --compile"``); the "compiled"
+  script is just the source, which the fake can run later.
+
+Environment:
+
+- ``FAKE_OSASCRIPT_LATENCY``: seconds to sleep per script (default 0.05).
+- ``FAKE_OSASCRIPT_STARTUP``: seconds to sleep when the process starts (default 0.1).
+- ``FAKE_OSASCRIPT_SAVE_LATENCY``: extra seconds for scripts that save a document,
+  reported as the ``file_written`` wait of the save (default 0).
+- ``FAKE_OSASCRIPT_LOG``: file that receives one JSON record per script.
+
+Arguments that look like output files (absolute paths ending in ``.key`` or ``.pdf``)
+get a small placeholder file, so steps after a save can run against real paths.
+
+Scripts can steer the fake with comment directives, which is handy for exercising
+error handling: ``-- fake: fail``, ``-- fake: crash`` and ``-- fake: sleep <seconds>``.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+DIRECTIVE = re.compile(r"--\s*fake:\s*(\w+)\s*([\d.]*)")
+# The waits a script reports are the ones its ``on run`` handler reaches: its own
+# wait_for calls, plus those of save_and_export (apple_prompt.DECK_HANDLERS), which
+# depend on the export format it is passed.
+RUN_HANDLER = re.compile(r"^on run argv$(.*?)^end run$", re.S | re.M)
+WAIT_OR_SAVE = re.compile(
+    r'my wait_for\("(\w+)"|my save_and_export\(\w+, \w+, (\w+), \w+\)'
+)
+ARGV_ITEM = re.compile(r"set (\w+) to \(?item (\d+) of argv")
+
+
+def record(mode, script, args):
+    log_path = os.getenv("FAKE_OSASCRIPT_LOG")
+    if not log_path:
+        return
+    entry = {"time": time.time(), "pid": os.getpid(), "mode": mode}
+    entry.update({"script": script, "args": list(args)})
+    with open(log_path, "a") as log:
+        log.write(json.dumps(entry) + "\n")
+
+
+OUTPUT_SUFFIXES = (".key", ".pdf")
+
+
+def write_outputs(args):
+    for arg in args:
+        arg = str(arg)
+        if os.path.isabs(arg) and arg.endswith(OUTPUT_SUFFIXES):
+            os.makedirs(os.path.dirname(arg), exist_ok=True)
+            with open(arg, "wb") as f:
+                f.write(b"fake keynote output\n")
+
+
+def simulate(script, args):
+    """Pretend to run a script; return (returncode, stdout, stderr)."""
+    time.sleep(float(os.getenv("FAKE_OSASCRIPT_LATENCY", "0.05")))
+    for action, value in DIRECTIVE.findall(script):
+        if action == "sleep":
+            time.sleep(float(value or 0))
+        elif action == "fail":
+            return 1, "", "execution error: simulated failure (-2700)"
+        elif action == "crash":
+            os._exit(70)
+    write_outputs(args)
+    match = RUN_HANDLER.search(script)
+    body = match.group(1) if match else script
+    if "my wait_report()" not in body:
+        return 0, "", ""
+    # Every wait is already satisfied, except the save, which takes
+    # FAKE_OSASCRIPT_SAVE_LATENCY.
+    save_latency = float(os.getenv("FAKE_OSASCRIPT_SAVE_LATENCY", "0"))
+    report = []
+    for name, millis in expected_waits(body, args):
+        if millis is None:
+            time.sleep(save_latency)
+            millis = int(save_latency * 1000)
+        report.append(f"{name}={millis}")
+    return 0, "WAITS:" + ",".join(report), ""
+
+
+def expected_waits(body, args):
+    """[(condition, millis)] for an ``on run`` body; millis is None for the save."""
+    items = {name: int(index) for name, index in ARGV_ITEM.findall(body)}
+
+    def argument(name):
+        index = items.get(name, 0)
+        return str(args[index - 1]) if 0 < index <= len(args) else ""
+
+    waits = []
+    for condition, export_format in WAIT_OR_SAVE.findall(body):
+        if condition:
+            waits.append((condition, 0))
+            continue
+        waits.append(("file_written", None))
+        export = argument(export_format)
+        if export == "pdf":
+            waits.append(("file_written", 0))
+        elif export == "png":
+            waits.append(("path_exists", 0))
+    return waits
+
+
+def parse_args(argv):
+    language, statements, rest = "AppleScript", [], []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "-l" and i + 1 < len(argv):
+            language = argv[i + 1]
+            i += 2
+        elif arg == "-e" and i + 1 < len(argv):
+            statements.append(argv[i + 1])
+            i += 2
+        else:
+            rest = argv[i:]
+            break
+    return language, statements, rest
+
+
+def run_worker():
+    """Serve the pool worker protocol until stdin closes."""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = json.loads(line)
+        script = request.get("source")
+        if script is None:
+            with open(request["path"], errors="replace") as f:
+                script = f.read()
+        record("worker", script, request.get("args", []))
+        code, out, err = simulate(script, request.get("args", []))
+        reply = {"id": request.get("id"), "ok": code == 0, "result": out}
+        if code:
+            reply.update({"error": err, "errorNumber": -2700})
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+def run_once(statements, rest):
+    if statements:
+        script, args = "\n".join(statements), rest
+    elif not rest or rest[0] == "-":
+        script, args = sys.stdin.read(), rest[1:]
+    else:
+        with open(rest[0], errors="replace") as f:
+            script, args = f.read(), rest[1:]
+    record("once", script, args)
+    code, out, err = simulate(script, args)
+    if out:
+        print(out)
+    if err:
+        print(err, file=sys.stderr)
+    return code
+
+
+def compile_script(argv):
+    output, sources = None, []
+    i = 0
+    while i < len(argv):
+        if argv[i] == "-o" and i + 1 < len(argv):
+            output = argv[i + 1]
+            i += 2
+        else:
+            sources.append(argv[i])
+            i += 1
+    if output is None:
+        print("osacompile: no output file given", file=sys.stderr)
+        return 1
+    if sources:
+        script = ""
+        for source in sources:
+            with open(source) as f:
+                script += f.read()
+    else:
+        script = sys.stdin.read()
+    record("compile", script, [output])
+    with open(output, "w") as f:
+        f.write(script)
+    return 0
+
+
+def main(argv):
+    time.sleep(float(os.getenv("FAKE_OSASCRIPT_STARTUP", "0.1")))
+    if argv and argv[0] == "--compile":
+        return compile_script(argv[1:])
+    language, statements, rest = parse_args(argv)
+    if language == "JavaScript" and statements:
+        run_worker()
+        return 0
+    return run_once(statements, rest)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""Native Gemini function calling for the agent.
+
+Instead of describing the tools in the prompt and parsing ``FUNCTION_CALL: name|a|b``
+lines, this mode hands each tool's MCP ``inputSchema`` to Gemini as a function
+declaration and reads typed arguments back from the response. ``google.genai`` is
+imported on first use, so text mode never pays for it.
+"""
+
+FUNCTION_SYSTEM_PROMPT = """You are a Keynote presentation assistant. You help create and edit Keynote presentations.
+
+- Call the tools to build the requested presentation and save it to the desktop
+- For presentations with several slides, build the whole deck in one create_presentation_from_outline call
+- To edit a deck you already created, call update_presentation with its path and the full list of slides it should have
+- When all necessary operations are done, reply with a one-line summary instead of a tool call"""
+
+
+def function_declarations(tools):
+    from google.genai import types
+
+    return [
+        types.FunctionDeclaration(
+            name=tool.name,
+            description=tool.description or "",
+            parameters_json_schema=tool.inputSchema,
+        )
+        for tool in tools
+    ]
+
+
+def function_config(tools):
+    """GenerateContentConfig exposing the MCP tools; the agent runs them itself."""
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        tools=[types.Tool(function_declarations=function_declarations(tools))],
+        automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+    )
+
+
+def function_calls(response):
+    """(name, args) for every function call in a response, in order."""
+    return [(call.name, dict(call.args or {})) for call in response.function_calls or []]
@@ -0,0 +1,172 @@
+"""Streamable HTTP transport: one server process shared by many clients.
+
+``python mcp_server.py http`` serves the FastMCP app over HTTP on localhost. Every
+client shares the process-wide script executor, Keynote manager, scheduler and
+caches, instead of spawning a private server over stdio. On top of FastMCP's app:
+
+- keep-alive: connections stay open ``KEYNOTE_HTTP_KEEP_ALIVE`` seconds between
+  requests, so a client's calls reuse one connection;
+- per-client limits: each MCP session (or, before it has one, each client address)
+  runs at most ``KEYNOTE_HTTP_CLIENT_CONCURRENCY`` requests at once; more wait, and
+  beyond ``KEYNOTE_HTTP_CLIENT_QUEUE`` waiting requests the client gets 429;
+- graceful draining: on SIGINT/SIGTERM new requests get 503 while the running ones
+  finish (up to ``KEYNOTE_HTTP_DRAIN_TIMEOUT`` seconds), then the server stops.
+"""
+
+import asyncio
+import json
+import os
+
+import uvicorn
+from sse_starlette.sse import AppStatus
+
+
+class _ClientSlots:
+    def __init__(self, limit):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+
+
+class ClientLimiter:
+    """ASGI middleware bounding concurrent requests per client, with draining."""
+
+    def __init__(self, app, per_client=None, max_waiting=None):
+        self.app = app
+        if per_client is None:
+            per_client = int(os.getenv("KEYNOTE_HTTP_CLIENT_CONCURRENCY", "4"))
+        if max_waiting is None:
+            max_waiting = int(os.getenv("KEYNOTE_HTTP_CLIENT_QUEUE", "32"))
+        self.per_client = max(1, per_client)
+        self.max_waiting = max_waiting
+        self.draining = False
+        self.in_flight = 0
+        self.requests = 0
+        self.queued = 0
+        self.rejected = 0
+        self.refused_draining = 0
+        self._clients = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @staticmethod
+    def client_key(scope):
+        for name, value in scope.get("headers", ()):
+            if name == b"mcp-session-id":
+                return "session:" + value.decode("latin-1")
+        host = (scope.get("client") or ("unknown",))[0]
+        return f"address:{host}"
+
+    async def __call__(self, scope, receive, send):
+        # Only POSTs carry requests; GET event streams and lifespan pass through
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        if self.draining:
+            self.refused_draining += 1
+            return await reject(send, 503, "Server is shutting down")
+
+        key = self.client_key(scope)
+        slots = self._clients.get(key)
+        if slots is None:
+            slots = self._clients[key] = _ClientSlots(self.per_client)
+        if slots.semaphore.locked():
+            if slots.waiting >= self.max_waiting:
+                self.rejected += 1
+                return await reject(send, 429, "Too many concurrent requests")
+            self.queued += 1
+
+        slots.waiting += 1
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            async with slots.semaphore:
+                slots.waiting -= 1
+                slots.active += 1
+                self.requests += 1
+                try:
+                    await self.app(scope, receive, send)
+                finally:
+                    slots.active -= 1
+        finally:
+            if slots.waiting == 0 and slots.active == 0:
+                self._clients.pop(key, None)
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+    async def drain(self, timeout):
+        """Refuse new requests and wait for the running ones; False on timeout."""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self):
+        return {
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "clients": len(self._clients),
+            "per_client_limit": self.per_client,
+            "requests": self.requests,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "refused_draining": self.refused_draining,
+        }
+
+
+async def reject(send, status, message):
+    body = json.dumps({"error": message}).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if status in (429, 503):
+        headers.append((b"retry-after", b"1"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains in-flight requests before it stops listening."""
+
+    def __init__(self, config, limiter, drain_timeout, log=print):
+        super().__init__(config)
+        self.limiter = limiter
+        self.drain_timeout = drain_timeout
+        self.log = log
+        # sse_starlette ends every event stream on the signal itself, which would cut
+        # off responses still streaming; we end them once the requests have drained
+        AppStatus.disable_automatic_graceful_drain()
+
+    async def shutdown(self, sockets=None):
+        self.log(f"Draining {self.limiter.in_flight} in-flight requests")
+        if not await self.limiter.drain(self.drain_timeout):
+            self.log(
+                f"Drain timed out after {self.drain_timeout}s with "
+                f"{self.limiter.in_flight} requests still running"
+            )
+        # What is left are idle event streams and keep-alive connections
+        AppStatus.should_exit = True
+        await super().shutdown(sockets)
+
+
+def create_server(mcp, log=print):
+    """uvicorn server for the FastMCP app, configured from KEYNOTE_HTTP_* settings.
+
+    Returns (server, limiter); the limiter's stats belong in health reports."""
+    mcp.settings.json_response = os.getenv("KEYNOTE_HTTP_JSON", "1") == "1"
+    limiter = ClientLimiter(mcp.streamable_http_app())
+    config = uvicorn.Config(
+        limiter,
+        host=os.getenv("KEYNOTE_HTTP_HOST", "127.0.0.1"),
+        port=int(os.getenv("KEYNOTE_HTTP_PORT", "8000")),
+        timeout_keep_alive=int(os.getenv("KEYNOTE_HTTP_KEEP_ALIVE", "75")),
+        # Requests are drained first; only idle streams are left to close
+        timeout_graceful_shutdown=1,
+        access_log=False,
+        log_level="warning",
+    )
+    drain_timeout = float(os.getenv("KEYNOTE_HTTP_DRAIN_TIMEOUT", "30"))
+    return DrainingServer(config, limiter, drain_timeout, log=log), limiter
@@ -0,0 +1,177 @@
+"""Warm Keynote session shared by all tool calls.
+
+Keynote is launched once, reused by every script, and quit after it has been idle for
+``KEYNOTE_IDLE_TIMEOUT`` seconds (0 keeps it running). Scripts close the documents they
+create themselves, so documents the user opened are never touched, and the idle quit
+is skipped while any such document is open.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from script_templates import get_registry
+
+# AppleScript errors meaning Keynote went away underneath us:
+# -600 "application isn't running", -609 "connection is invalid".
+APP_GONE_ERRORS = (-600, -609)
+
+
+def app_gone(result):
+    if result.returncode in APP_GONE_ERRORS:
+        return True
+    return any(f"({code})" in result.stderr for code in APP_GONE_ERRORS)
+
+
+class KeynoteAppManager:
+    """Launch Keynote on demand, keep it warm, and quit it when idle."""
+
+    def __init__(self, registry=None, idle_timeout=None):
+        self.registry = registry or get_registry()
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv("KEYNOTE_IDLE_TIMEOUT", "300"))
+        self.idle_timeout = idle_timeout
+        self.running = False
+        self.launches = 0
+        self.restarts = 0
+        self.idle_shutdowns = 0
+        self.scripts_run = 0
+        self.failures = 0
+        self.last_used = None
+        self._active = 0
+        self._lock = threading.RLock()
+        self._launch_lock = threading.Lock()
+        self._timer = None
+        # Cleared while quit_keynote runs; scripts wait for it instead of racing the quit
+        self._quit_done = threading.Event()
+        self._quit_done.set()
+
+    def ensure_running(self):
+        self._quit_done.wait()
+        with self._launch_lock:
+            if self.running:
+                return
+            result = self.registry.run("launch_keynote")
+            if not result.ok:
+                raise RuntimeError(f"Could not launch Keynote: {result.stderr}")
+            with self._lock:
+                self.running = True
+                self.launches += 1
+
+    async def run_async(self, name, args=(), timeout=None):
+        """Run a template against the warm Keynote, relaunching it once if it died."""
+        self._begin()
+        try:
+            if not self.running or not self._quit_done.is_set():
+                await asyncio.to_thread(self.ensure_running)
+            result = await self.registry.run_async(name, args, timeout=timeout)
+            if app_gone(result):
+                self._mark_gone()
+                await asyncio.to_thread(self.ensure_running)
+                result = await self.registry.run_async(name, args, timeout=timeout)
+            self._record(result)
+            return result
+        finally:
+            self._finish()
+
+    def _begin(self):
+        with self._lock:
+            self._active += 1
+            self._cancel_timer()
+
+    def _finish(self):
+        with self._lock:
+            self._active -= 1
+            self.last_used = time.monotonic()
+            if self._active == 0:
+                self._schedule_timer()
+
+    def _mark_gone(self):
+        # Concurrent scripts can all notice the same crash; count it once.
+        with self._lock:
+            if self.running:
+                self.running = False
+                self.restarts += 1
+
+    def _record(self, result):
+        with self._lock:
+            self.scripts_run += 1
+            if not result.ok:
+                self.failures += 1
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_timer(self):
+        self._cancel_timer()
+        if self.idle_timeout > 0 and self.running:
+            self._timer = threading.Timer(self.idle_timeout, self._idle_check)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _idle_check(self):
+        with self._lock:
+            if self._active or not self.running:
+                return
+            if time.monotonic() - self.last_used < self.idle_timeout:
+                return
+            self._timer = None
+        if self.shutdown():
+            with self._lock:
+                self.idle_shutdowns += 1
+        else:
+            # Documents we did not create are open; check again after another timeout
+            with self._lock:
+                if not self._active:
+                    self._schedule_timer()
+
+    def shutdown(self):
+        """Quit Keynote unless scripts are running or documents we did not create are
+        open. Scripts that start meanwhile wait for the quit, then relaunch Keynote."""
+        with self._lock:
+            self._cancel_timer()
+            if not self.running or self._active:
+                return False
+            self._quit_done.clear()
+        try:
+            result = self.registry.run("quit_keynote")
+            if result.ok and "QUIT:in-use" not in result.stdout:
+                with self._lock:
+                    self.running = False
+                return True
+            return False
+        finally:
+            self._quit_done.set()
+
+    def health(self):
+        with self._lock:
+            idle_for = None
+            if self.last_used is not None:
+                idle_for = round(time.monotonic() - self.last_used, 1)
+            return {
+                "running": self.running,
+                "active_scripts": self._active,
+                "idle_for_s": idle_for,
+                "idle_timeout_s": self.idle_timeout,
+                "launches": self.launches,
+                "restarts": self.restarts,
+                "idle_shutdowns": self.idle_shutdowns,
+                "scripts_run": self.scripts_run,
+                "failures": self.failures,
+            }
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_app_manager():
+    """Return the process-wide Keynote manager, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = KeynoteAppManager()
+        return _manager
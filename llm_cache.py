@@ -0,0 +1,153 @@
+"""Memoization of LLM responses for the agent.
+
+Responses are keyed by the model name and a hash of the prompt. Lookups go through an
+in-memory LRU first and then an on-disk store (one JSON file per key under
+``AGENT_LLM_CACHE_DIR``); entries older than ``AGENT_LLM_CACHE_TTL`` seconds are
+ignored, and removed from disk by a sweep that runs on the first store and then at
+most once per ``PRUNE_INTERVAL``. Set ``AGENT_LLM_CACHE=0`` to always call the model.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from types import SimpleNamespace
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "keynotemcp", "llm")
+
+PRUNE_INTERVAL = 3600
+
+
+class CachedResponse:
+    """Stand-in for a generate_content response served from the cache."""
+
+    def __init__(self, text, function_calls=None):
+        self.text = text
+        self.function_calls = [
+            SimpleNamespace(name=call["name"], args=call["args"])
+            for call in function_calls or []
+        ]
+
+
+def prompt_key(model, prompt):
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LLMCache:
+    def __init__(self, directory=None, max_entries=256, ttl=None, enabled=None):
+        self.directory = directory or os.getenv("AGENT_LLM_CACHE_DIR", DEFAULT_DIR)
+        self.max_entries = max_entries
+        if ttl is None:
+            ttl = float(os.getenv("AGENT_LLM_CACHE_TTL", "86400"))
+        self.ttl = ttl
+        if enabled is None:
+            enabled = os.getenv("AGENT_LLM_CACHE", "1") != "0"
+        self.enabled = enabled
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.pruned = 0
+        self._last_prune = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _fresh(self, entry):
+        return time.time() - entry["created"] <= self.ttl
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, model, prompt):
+        """Return the cached response as a CachedResponse, or None."""
+        if not self.enabled:
+            return None
+        key = prompt_key(model, prompt)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._fresh(entry):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return CachedResponse(entry["text"], entry.get("function_calls"))
+                del self._memory[key]
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        with self._lock:
+            if entry is None or entry.get("model") != model or not self._fresh(entry):
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.disk_hits += 1
+            return CachedResponse(entry["text"], entry.get("function_calls"))
+
+    def put(self, model, prompt, text, function_calls=None):
+        """Store a response; function_calls is a list of (name, args) pairs."""
+        if not self.enabled or (text is None and not function_calls):
+            return
+        key = prompt_key(model, prompt)
+        entry = {"model": model, "created": time.time(), "text": text}
+        if function_calls:
+            entry["function_calls"] = [
+                {"name": name, "args": args} for name, args in function_calls
+            ]
+        with self._lock:
+            self._remember(key, entry)
+            now = entry["created"]
+            prune = self._last_prune is None or now - self._last_prune >= PRUNE_INTERVAL
+            if prune:
+                self._last_prune = now
+        if prune:
+            self.prune(now)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write LLM cache entry: {e}")
+
+    def prune(self, now=None):
+        """Delete on-disk entries (and abandoned temp files) older than the TTL."""
+        now = time.time() if now is None else now
+        removed = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    continue
+        with self._lock:
+            self.pruned += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "pruned": self.pruned,
+            }
@@ -0,0 +1,237 @@
+"""Client-side flow control for LLM calls.
+
+One ``LLMController`` is shared by every agent run in the process. Each call:
+
+1. waits for the request and token budgets (token buckets, per minute),
+2. waits for a concurrency slot; the number of slots follows AIMD: it grows by one
+   per window of successful calls and is halved whenever the API throttles us,
+3. runs with a per-attempt timeout, and
+4. on throttling or a transient error retries with full-jitter exponential backoff.
+
+Settings come from ``AGENT_LLM_RPM``, ``AGENT_LLM_TPM``, ``AGENT_LLM_MAX_CONCURRENCY``,
+``AGENT_LLM_MAX_RETRIES`` and ``AGENT_LLM_ATTEMPT_TIMEOUT``.
+"""
+
+import asyncio
+import os
+import random
+import time
+import weakref
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def error_status(error):
+    """HTTP-ish status of an API error, if it carries one."""
+    for attribute in ("code", "status_code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_throttle(error):
+    # Only the status or Gemini's status name: a bare "429" in the message may be
+    # part of a path or an id
+    return error_status(error) == 429 or "RESOURCE_EXHAUSTED" in str(error)
+
+
+def is_retryable(error):
+    if is_throttle(error) or isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if error_status(error) in RETRYABLE_STATUS:
+        return True
+    # httpx transport errors (ConnectTimeout, ReadError, ...) without importing httpx
+    name = type(error).__name__
+    return "Timeout" in name or "Connect" in name
+
+
+def estimate_tokens(prompt):
+    return max(1, len(str(prompt)) // 4)
+
+
+class PerLoop:
+    """One asyncio primitive per running event loop.
+
+    asyncio locks bind to the first loop that waits on them, but the controller is
+    module-level and outlives loops (every asyncio.run in a batch or benchmark)."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._values = weakref.WeakKeyDictionary()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        value = self._values.get(loop)
+        if value is None:
+            value = self._values[loop] = self.factory()
+        return value
+
+    def values(self):
+        """The primitives of every loop still alive."""
+        return list(self._values.values())
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute up to one minute's worth."""
+
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = PerLoop(asyncio.Lock)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        if self.rate <= 0:
+            return
+        # A single request larger than the whole bucket waits for a full bucket.
+        amount = min(amount, self.capacity)
+        async with self._lock.get():
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount):
+        """Charge (or refund) the difference once the real usage is known."""
+        if self.rate > 0:
+            self._refill()
+            self.tokens -= amount
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease."""
+
+    def __init__(self, max_limit, min_limit=1, decrease=0.5):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = min_limit
+        self.decrease = decrease
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._conditions = PerLoop(asyncio.Condition)
+
+    async def acquire(self):
+        condition = self._conditions.get()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._conditions.get()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    async def on_success(self):
+        condition = self._conditions.get()
+        async with condition:
+            # +1 slot after a full window (limit) of successful calls
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            condition.notify_all()
+
+    async def on_throttle(self):
+        async with self._conditions.get():
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+
+
+class LLMController:
+    def __init__(
+        self,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_concurrency=None,
+        max_retries=None,
+        attempt_timeout=None,
+        base_delay=1.0,
+        max_delay=60.0,
+    ):
+        def setting(value, name, default):
+            return float(os.getenv(name, default)) if value is None else value
+
+        self.requests = TokenBucket(setting(requests_per_minute, "AGENT_LLM_RPM", "60"))
+        self.tokens = TokenBucket(setting(tokens_per_minute, "AGENT_LLM_TPM", "1000000"))
+        self.limiter = AIMDLimiter(
+            int(setting(max_concurrency, "AGENT_LLM_MAX_CONCURRENCY", "8"))
+        )
+        self.max_retries = int(setting(max_retries, "AGENT_LLM_MAX_RETRIES", "5"))
+        self.attempt_timeout = setting(attempt_timeout, "AGENT_LLM_ATTEMPT_TIMEOUT", "120")
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.throttles = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def backoff(self, attempt):
+        """Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    async def call(self, make_call, prompt_tokens=1, timeout=None, usage_tokens=None):
+        """Run ``await make_call()`` under the limits, retrying transient failures.
+
+        ``usage_tokens(result)`` may return the real token count so the token bucket
+        can be corrected after the fact."""
+        timeout = self.attempt_timeout if timeout is None else timeout
+        self.calls += 1
+        attempt = 0
+        while True:
+            queued = time.monotonic()
+            await self.requests.acquire()
+            await self.tokens.acquire(prompt_tokens)
+            await self.limiter.acquire()
+            waited = time.monotonic() - queued
+            self.queue_wait_total += waited
+            self.queue_wait_max = max(self.queue_wait_max, waited)
+            self.attempts += 1
+            try:
+                result = await asyncio.wait_for(make_call(), timeout=timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                if is_throttle(e):
+                    self.throttles += 1
+                    await self.limiter.on_throttle()
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                self.retries += 1
+                print(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt} in {delay:.1f}s")
+            else:
+                await self.limiter.on_success()
+                if usage_tokens is not None:
+                    used = usage_tokens(result)
+                    if used:
+                        self.tokens.adjust(used - prompt_tokens)
+                return result
+            finally:
+                await self.limiter.release()
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "throttles": self.throttles,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "concurrency_limit": round(self.limiter.limit, 2),
+            "queue_wait_avg_s": round(self.queue_wait_total / self.attempts, 3)
+            if self.attempts
+            else 0.0,
+            "queue_wait_max_s": round(self.queue_wait_max, 3),
+        }
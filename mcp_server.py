@@ -1,179 +1,481 @@
 # basic import
-from mcp.server.fastmcp import FastMCP, Image
-from mcp.server.fastmcp.prompts import base
+from mcp.server.fastmcp import FastMCP
 from mcp.types import TextContent
-from mcp import types
-from apple_prompt import get_create_keynote_prompt, get_save_keynote_prompt
-import subprocess
+from apple_prompt import (
+    EXPORT_FORMATS,
+    get_create_keynote_args,
+    get_create_outline_args,
+    get_import_deck_args,
+    get_update_deck_args,
+)
+from artifact_cache import ArtifactCache, cache_key
+from deck_manifest import ManifestStore, diff_slides
+from keynote_app import get_app_manager
+from metrics import StageStats
+from readiness import format_waits, parse_wait_report
+from scheduler import DocumentScheduler
+from script_executor import get_executor
+from script_templates import TemplateCompileError, get_registry
+from slide_model import normalize_shape, normalize_slides
+from tracing import Tracer
+import asyncio
+import functools
+import json
 import time
 import os
-import threading
 import sys
 import tempfile
+import uuid
 
 # instantiate an MCP server client
 mcp = FastMCP("KeynoteAssistant")
 
+# Runs different documents in parallel and the same document one request at a time
+scheduler = DocumentScheduler()
+
+# Decks already generated with identical arguments, reused without touching Keynote
+artifact_cache = ArtifactCache()
+
+# Server-side stage latencies (request, render, script, save), reported by keynote_health
+# over the last KEYNOTE_STATS_WINDOW samples per stage
+stage_stats = StageStats(max_samples=int(os.getenv("KEYNOTE_STATS_WINDOW", "2048")))
+
+# Spans for every tool call, written as JSON lines to KEYNOTE_TRACE ("stderr" or a
+# file path); histograms and counters are published as the keynote://metrics resource
+tracer = Tracer("keynote-mcp-server", stage_stats, env="KEYNOTE_TRACE")
+
+# Slide model of every deck we saved, so update_presentation can patch it
+manifests = ManifestStore()
+
+# How outlines reach Keynote: "applescript" sets every slide and shape through
+# AppleEvents; "pptx" renders the deck offline and imports it with one script
+RENDER_BACKEND = os.getenv("KEYNOTE_RENDER_BACKEND", "applescript")
+
+# Per-client limits and draining of the HTTP transport; None over stdio
+http_limiter = None
+
 # DEFINE TOOLS
 
 
-@mcp.tool()
-def create_keynote_with_text(
-    text: str = "Apple", width: int = 540, height: int = 430
-) -> dict:
-    """
-    Create a new Keynote presentation with a rectangular shape containing text.
-    Rectangle specs are customizable with default 540x430, black text.
-    """
+def log(message):
+    """Progress output; stdout carries the stdio transport, so it goes to stderr."""
+    print(message, file=sys.stderr, flush=True)
+
+
+def traced(tool):
+    """Run an async tool inside a "request" span and count its calls."""
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        tracer.count(f"tool_calls.{tool.__name__}")
+        with tracer.span("request", tool=tool.__name__):
+            return await tool(*args, **kwargs)
+
+    return wrapper
+
+
+def text_response(text):
+    return {"content": [TextContent(type="text", text=text)]}
+
+
+def resolve_output_path(output_path):
+    """Absolute .key path for the caller's output_path.
+
+    Without one, every request gets its own file on the Desktop, so concurrent
+    requests never overwrite each other's output."""
+    if not output_path:
+        name = f"keynote-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}.key"
+        return os.path.join(os.path.expanduser("~"), "Desktop", name)
+    path = os.path.abspath(os.path.expanduser(output_path))
+    if not path.endswith(".key"):
+        path += ".key"
+    return path
+
+
+def export_path_for(file_path, export_format):
+    """Where the optional export goes: a .pdf file or a folder of PNG slide images."""
+    stem = file_path[: -len(".key")]
+    if export_format == "pdf":
+        return stem + ".pdf"
+    if export_format == "png":
+        return stem + "-png"
+    return ""
+
+
+class ToolError(Exception):
+    """Failure that is reported back to the client as the tool's text result."""
+
+
+def plan_output(output_path, export_format):
+    """Validate the output options; returns (file_path, export_format, export_path)."""
+    export_format = (export_format or "").lower()
+    if export_format and export_format not in EXPORT_FORMATS:
+        raise ToolError(
+            f"Unsupported export_format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}"
+        )
+
     # Path for saving
-    user_home = os.path.expanduser("~")
-    file_path = f"{user_home}/Desktop/my_new.key"
+    file_path = resolve_output_path(output_path)
+    export_path = export_path_for(file_path, export_format)
+    return file_path, export_format, export_path
+
 
+def clear_output(file_path):
+    """Make room for a new deck at file_path; runs under the document's lock."""
     # Remove existing file if it exists
     if os.path.exists(file_path):
         try:
             os.remove(file_path)
-            print(f"Removed existing file: {file_path}")
+            log(f"Removed existing file: {file_path}")
         except Exception as e:
-            print(f"Error removing existing file: {str(e)}")
-            return {
-                "content": [
-                    TextContent(
-                        type="text", text=f"Error removing existing file: {str(e)}"
-                    )
-                ]
-            }
-
-    # Script to create a new Keynote presentation with rectangle and text
-    # create_script = f"""
-    # tell application "Keynote"
-    # -- Open Keynote and create a new presentation
-    # activate
-    # delay 2
-    #
-    # -- Create a new presentation
-    # make new document
-    # delay 2
-    #
-    # -- Get a reference to the first slide
-    # tell front document
-    # tell the current slide
-    # -- Create a new shape (rectangle)
-    # set newShape to make new shape
-    #
-    # -- Set shape properties
-    # set the width of newShape to {width}
-    # set the height of newShape to {height}
-    #
-    # -- Center the shape on the slide
-    # set the position of newShape to {{400, 300}}
-    #
-    # -- Add text to the shape
-    # set the object text of newShape to "{text}"
-    #
-    # -- Format the text
-    # tell the object text of newShape
-    # set the font to "Helvetica"
-    # set the size to 72
-    # set the alignment to center
-    # end tell
-    # end tell
-    #
-    # -- Save the presentation
-    # save in "{file_path}" replacing yes
-    # delay 2
-    #
-    # -- Close Keynote
-    # quit
-    # end tell
-    # end tell
-    # """
-    # Run the AppleScript to create the presentation
-    create_script = get_create_keynote_prompt(text=text, width=width, height=height)
-    try:
-        # Create a temporary AppleScript file
+            log(f"Error removing existing file: {str(e)}")
+            raise ToolError(f"Error removing existing file: {str(e)}")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
 
-        with tempfile.NamedTemporaryFile(
-            suffix=".scpt", delete=False, mode="w"
-        ) as script_file:
-            script_file.write(create_script)
-            script_path = script_file.name
+async def run_deck_script(name, args):
+    """Run a deck-building template in one execution against the warm Keynote session."""
+    executor = get_executor()
+    with tracer.span("script", template=name, executor=executor.name) as span:
+        try:
+            result = await get_app_manager().run_async(name, args)
+        except TemplateCompileError as e:
+            log(f"Error compiling script template: {str(e)}")
+            raise ToolError(f"Error compiling script template: {str(e)}")
+        except RuntimeError as e:
+            log(f"Error starting Keynote: {str(e)}")
+            raise ToolError(f"Error starting Keynote: {str(e)}")
+        span["returncode"] = result.returncode
+        waits = parse_wait_report(result.stdout)
+        # The file save happens inside the script, which reports how long it waited
+        saves = [seconds for condition, seconds in waits if condition == "file_written"]
+        if saves:
+            tracer.record("save", sum(saves), template=name)
+    log(
+        f"Script {name} finished in {result.elapsed:.2f}s via {executor.name} "
+        f"({format_waits(waits)})"
+    )
+    if not result.ok:
+        tracer.count("script_failures")
+        log(f"Error creating presentation: {result.stderr}")
+        raise ToolError(f"Error creating presentation: {result.stderr}")
+    return result
 
-        print(f"Created temporary script file: {script_path}")
 
-        # Execute the AppleScript file
-        create_result = subprocess.run(
-            ["osascript", script_path], capture_output=True, text=True
-        )
+async def build_deck(
+    name, file_path, export_path, args, cache_arguments, slides, render=None
+):
+    """Build the deck at file_path, reusing an identical earlier build when cached.
 
-        # Clean up the temporary file
-        os.remove(script_path)
-
-    except:
-        print(f"Error creating presentation: {create_result.stderr}")
-        # return {
-        # "content": [
-        # TextContent(
-        # type="text", text=f"Error creating presentation: {create_result.stderr}"
-        # )
-        # ]
-        # }
-        # if create_result.returncode != 0:
-        # print(f"Error creating presentation: {create_result.stderr}")
-        # return {
-        # "content": [
-        # TextContent(
-        # type="text",
-        # text=f"Error creating presentation: {create_result.stderr}",
-        # )
-        # ]
-        # }
-
-    # Run the AppleScript to save the file
-    save_script = get_save_keynote_prompt()
-    try:
+    slides is the deck's slide model, recorded as its manifest once it is saved.
+    render, if given, runs (in a thread) before the script and returns the path of a
+    temporary file the script consumes; it is removed afterwards. Operations on the
+    same file run one at a time. Returns True on a cache hit."""
+    outputs = {"deck": file_path}
+    if export_path:
+        outputs["export"] = export_path
+    # The output paths are not part of the key: the same content is a hit anywhere
+    key = cache_key(name, cache_arguments, get_registry().version(name))
+
+    async def operation():
+        clear_output(file_path)
+        if await asyncio.to_thread(artifact_cache.get, key, outputs):
+            tracer.count("artifact_cache_hits")
+            log(f"Served {file_path} from the artifact cache")
+            await asyncio.to_thread(manifests.put, file_path, slides)
+            return True
+        source_path = await asyncio.to_thread(render) if render else None
+        try:
+            await run_deck_script(name, args)
+        finally:
+            if source_path and os.path.exists(source_path):
+                os.remove(source_path)
+        await asyncio.to_thread(artifact_cache.put, key, outputs)
+        await asyncio.to_thread(manifests.put, file_path, slides)
+        return False
+
+    return await scheduler.run(file_path, operation)
 
-        with tempfile.NamedTemporaryFile(
-            suffix=".scpt", delete=False, mode="w"
-        ) as script_file:
-            script_file.write(save_script)
-            script_path = script_file.name
 
-        print(f"Created temporary script file: {script_path}")
+async def import_rendered_deck(slides, file_path, export_format, export_path):
+    """Render slides to a PPTX offline, then import and save it with one script."""
+    # Only the pptx backend needs the renderer
+    from pptx_render import RENDERER_VERSION, render_pptx
 
-        # Execute the AppleScript file
-        create_result = subprocess.run(
-            ["osascript", script_path], capture_output=True, text=True
+    source_path = os.path.join(
+        tempfile.gettempdir(), f"keynote-import-{uuid.uuid4().hex}.pptx"
+    )
+
+    def render():
+        start = time.perf_counter()
+        with tracer.span("render", backend="pptx", slides=len(slides)):
+            render_pptx(slides, source_path)
+        elapsed = time.perf_counter() - start
+        log(f"Rendered {len(slides)} slides to {source_path} in {elapsed:.3f}s")
+        return source_path
+
+    return await build_deck(
+        "import_deck",
+        file_path,
+        export_path,
+        get_import_deck_args(source_path, file_path, export_format, export_path),
+        {"slides": slides, "export_format": export_format, "renderer": RENDERER_VERSION},
+        slides,
+        render=render,
+    )
+
+
+async def build_outline(slides, file_path, export_format, export_path):
+    """Build a whole deck from normalized slides with the configured backend."""
+    if RENDER_BACKEND == "pptx":
+        return await import_rendered_deck(slides, file_path, export_format, export_path)
+    with tracer.span("render", backend="applescript", slides=len(slides)):
+        args = get_create_outline_args(
+            slides,
+            output_path=file_path,
+            export_format=export_format,
+            export_path=export_path,
         )
+    return await build_deck(
+        "create_outline",
+        file_path,
+        export_path,
+        args,
+        {"slides": slides, "export_format": export_format},
+        slides,
+    )
+
 
-        # Clean up the temporary file
-        os.remove(script_path)
-    except:
-        print(f"Error saving presentation: {create_result.stderr}")
-        return {
-            "content": [
-                TextContent(
-                    type="text",
-                    text=f"Error saving presentation: {create_result.stderr}",
+async def patch_deck(slides, file_path, export_format, export_path):
+    """Apply only the slide changes since the deck's manifest.
+
+    Returns the operations applied, or None when there is no deck at file_path yet.
+    A deck without a current manifest is never overwritten: it raises ToolError."""
+
+    async def operation():
+        recorded = await asyncio.to_thread(manifests.get, file_path)
+        if recorded is None:
+            if os.path.exists(file_path):
+                raise ToolError(
+                    f"{file_path} was not created by these tools or was edited since, "
+                    "so it cannot be updated in place and was left untouched; pass a "
+                    "new output_path to build the deck there"
                 )
-            ]
-        }
-
-        return {
-            "content": [
-                TextContent(
-                    type="text",
-                    text=f"Keynote presentation with '{text}' created and saved to {file_path}",
+            return None
+        ops = diff_slides(recorded, slides)
+        if ops or export_format:
+            await run_deck_script(
+                "update_deck",
+                get_update_deck_args(file_path, ops, export_format, export_path),
+            )
+            await asyncio.to_thread(manifests.put, file_path, slides)
+        return ops
+
+    return await scheduler.run(file_path, operation)
+
+
+def saved_message(description, file_path, export_format, export_path, cached=False):
+    message = f"Keynote presentation {description} created and saved to {file_path}"
+    if export_path:
+        message += f" and exported as {export_format.upper()} to {export_path}"
+    if cached:
+        message += " (reused from cache)"
+    return message
+
+
+@mcp.tool()
+@traced
+async def create_keynote_with_text(
+    text: str = "Apple",
+    width: int = 540,
+    height: int = 430,
+    output_path: str = "",
+    export_format: str = "",
+) -> dict:
+    """
+    Create a new Keynote presentation with a rectangular shape containing text.
+    Rectangle specs are customizable with default 540x430, black text.
+    The deck is saved to output_path (default: a new file on the Desktop); set
+    export_format to "pdf" or "png" to also export it in the same run.
+    """
+    try:
+        file_path, export_format, export_path = plan_output(output_path, export_format)
+        cached = await build_deck(
+            "create_keynote",
+            file_path,
+            export_path,
+            get_create_keynote_args(
+                text=text,
+                width=width,
+                height=height,
+                output_path=file_path,
+                export_format=export_format,
+                export_path=export_path,
+            ),
+            {
+                "text": text,
+                "width": int(width),
+                "height": int(height),
+                "export_format": export_format,
+            },
+            [
+                {
+                    "title": "",
+                    "bullets": [],
+                    "shapes": [
+                        normalize_shape({"text": text, "width": width, "height": height})
+                    ],
+                }
+            ],
+        )
+    except ToolError as e:
+        return text_response(str(e))
+    return text_response(
+        saved_message(f"with '{text}'", file_path, export_format, export_path, cached)
+    )
+
+
+@mcp.tool()
+@traced
+async def create_presentation_from_outline(
+    slides: list, output_path: str = "", export_format: str = ""
+) -> dict:
+    """
+    Build a whole multi-slide Keynote presentation in one call.
+    slides is a list like [{"title": "Intro", "bullets": ["Point 1", "Point 2"],
+    "shapes": [{"text": "Hi", "width": 540, "height": 430, "x": 400, "y": 540}]}];
+    a plain string is a title-only slide. Saved to output_path
+    (default: a new file on the Desktop), optionally exported as "pdf" or "png".
+    """
+    try:
+        slides = normalize_slides(slides)
+    except ValueError as e:
+        return text_response(f"Invalid slides: {str(e)}")
+    try:
+        file_path, export_format, export_path = plan_output(output_path, export_format)
+        cached = await build_outline(slides, file_path, export_format, export_path)
+    except ToolError as e:
+        return text_response(str(e))
+    return text_response(
+        saved_message(
+            f"with {len(slides)} slides", file_path, export_format, export_path, cached
+        )
+    )
+
+
+@mcp.tool()
+@traced
+async def update_presentation(
+    slides: list, output_path: str, export_format: str = ""
+) -> dict:
+    """
+    Bring the deck at output_path to the given slides (same format as
+    create_presentation_from_outline), editing only the slides that were added,
+    changed or removed. A deck that does not exist yet is built in full; decks these
+    tools did not create, or that were edited by hand since, are left untouched and
+    an error asks for a new output_path. Optionally re-exported as "pdf" or "png".
+    """
+    if not output_path:
+        return text_response("output_path is required: the deck to update")
+    try:
+        slides = normalize_slides(slides)
+    except ValueError as e:
+        return text_response(f"Invalid slides: {str(e)}")
+    try:
+        file_path, export_format, export_path = plan_output(output_path, export_format)
+        ops = await patch_deck(slides, file_path, export_format, export_path)
+        if ops is None:
+            tracer.count("update_rebuilds")
+            log(f"No deck at {file_path} yet, building it")
+            cached = await build_outline(slides, file_path, export_format, export_path)
+            return text_response(
+                saved_message(
+                    f"with {len(slides)} slides",
+                    file_path,
+                    export_format,
+                    export_path,
+                    cached,
                 )
-            ]
-        }
+            )
+    except ToolError as e:
+        return text_response(str(e))
+    written = sum(1 for op in ops if op[0] == "insert")
+    removed = len(ops) - written
+    message = (
+        f"Keynote presentation updated and saved to {file_path}: {len(ops)} slide "
+        f"operations ({written} slides written, {removed} deleted)"
+    )
+    if export_path:
+        message += f"; exported as {export_format.upper()} to {export_path}"
+    return text_response(message)
+
+
+@mcp.tool()
+def keynote_health() -> dict:
+    """
+    Report the state of the warm Keynote session: whether it is running, idle time,
+    launch/restart/idle-shutdown counters, plus script executor, scheduler,
+    template cache and artifact cache (hit/miss) stats, stage latencies and, over
+    HTTP, per-client limits.
+    """
+    health = {
+        "keynote": get_app_manager().health(),
+        "executor": get_executor().stats(),
+        "scheduler": scheduler.stats(),
+        "templates": get_registry().stats(),
+        "artifact_cache": artifact_cache.stats(),
+        "manifests": manifests.stats(),
+        "stages": stage_stats.snapshot(),
+        "render_backend": RENDER_BACKEND,
+    }
+    if http_limiter is not None:
+        health["http"] = http_limiter.stats()
+    return text_response(json.dumps(health))
+
+
+@mcp.resource("keynote://metrics", mime_type="application/json")
+def keynote_metrics() -> str:
+    """Per-stage latency histograms (all-time bucket counts) with percentiles over
+    recent samples, and counters of tool calls, cache hits, rebuilds and failures."""
+    return json.dumps(tracer.snapshot(histograms=True))
+
+
+def warm_up():
+    """Pay first-use costs before a client connects: compile every script template
+    and start the script workers; KEYNOTE_PREWARM=keynote also launches Keynote."""
+    start = time.perf_counter()
+    registry = get_registry()
+    for name in registry.templates:
+        registry.compiled_path(name)
+    executor = get_executor()
+    # Backends without long-lived workers have nothing to start
+    if hasattr(executor, "start"):
+        executor.start()
+    if os.getenv("KEYNOTE_PREWARM") == "keynote":
+        get_app_manager().ensure_running()
+    log(f"Warmed up in {time.perf_counter() - start:.3f}s")
 
 
 # DEFINE PROMPTS
 if __name__ == "__main__":
-    # Check if running with mcp dev command
-    print("STARTING KEYNOTE MCP SERVER")
+    if os.getenv("KEYNOTE_PREWARM"):
+        try:
+            warm_up()
+        except Exception as e:
+            # The first tool call will retry and report whatever failed here
+            log(f"Warm-up failed: {str(e)}")
+    # Check if running with mcp dev command; warm_server.py waits for this line
+    log("STARTING KEYNOTE MCP SERVER")
     if len(sys.argv) > 1 and sys.argv[1] == "dev":
         mcp.run()  # Run without transport for dev server
+    elif len(sys.argv) > 1 and sys.argv[1] == "http":
+        # One process for many clients over streamable HTTP (see http_transport)
+        from http_transport import create_server
+
+        server, http_limiter = create_server(mcp, log=log)
+        log(f"Serving streamable HTTP on {server.config.host}:{server.config.port}")
+        server.run()
     else:
         mcp.run(transport="stdio")  # Run with stdio for direct execution
+    # Quit the Keynote we kept warm (if it is idle) before exiting
+    get_app_manager().shutdown()
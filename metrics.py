@@ -0,0 +1,76 @@
+"""Latency statistics per stage.
+
+``StageStats`` keeps every duration recorded for a named stage (handshake, llm,
+coercion, tool, script, save, ...) and summarizes them as count, mean and
+percentiles, for the benchmarks and the server's health report. A long-running
+process passes ``max_samples`` to keep only the most recent durations for the
+percentiles; the histogram buckets count every duration ever recorded.
+"""
+
+import bisect
+import collections
+import math
+import threading
+
+# Upper bounds (seconds) of the histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_s": round(sum(values) / len(values), 4),
+        "p50_s": round(percentile(values, 0.50), 4),
+        "p95_s": round(percentile(values, 0.95), 4),
+        "p99_s": round(percentile(values, 0.99), 4),
+        "max_s": round(values[-1], 4),
+    }
+
+
+def bucket_labels(bounds=LATENCY_BUCKETS):
+    return [f"le_{bound}" for bound in bounds] + ["le_inf"]
+
+
+class StageStats:
+    def __init__(self, max_samples=None):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = collections.deque(maxlen=self.max_samples)
+                self._buckets[stage] = [0] * (len(LATENCY_BUCKETS) + 1)
+            samples.append(seconds)
+            self._buckets[stage][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._buckets.clear()
+
+    def snapshot(self, histograms=False):
+        """Summary per stage; with histograms, also the all-time count per bucket."""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+            buckets = {stage: list(counts) for stage, counts in self._buckets.items()}
+        summary = {stage: summarize(values) for stage, values in samples.items()}
+        if histograms:
+            labels = bucket_labels()
+            for stage, counts in buckets.items():
+                summary[stage]["total"] = sum(counts)
+                summary[stage]["histogram"] = dict(zip(labels, counts))
+        return summary
@@ -0,0 +1,230 @@
+"""Offline rendering of a slide model to a PPTX package.
+
+Each slide is serialized and written to the zip as soon as it is built, so memory
+use stays at one slide and generation time grows linearly with the deck; the
+package-level parts that list every slide are written last. Keynote then turns the
+file into a deck with a single open/save script (``import_deck`` in apple_prompt),
+instead of one AppleEvent per shape and text property.
+
+Coordinates in the slide model are Keynote points on a 1920x1080 slide.
+"""
+
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# Bump when the generated XML changes, so cached decks built from it are not reused
+RENDERER_VERSION = "1"
+
+SLIDE_WIDTH = 1920
+SLIDE_HEIGHT = 1080
+EMU_PER_POINT = 12700
+
+TITLE_BOX = (96, 60, 1728, 180)
+BODY_BOX = (96, 270, 1728, 720)
+
+NS = (
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+)
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Characters XML 1.0 cannot carry at all
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _text(value):
+    return escape(_INVALID_XML.sub("", value))
+
+
+def _emu(points):
+    return int(points) * EMU_PER_POINT
+
+
+def _xfrm(x, y, width, height):
+    return (
+        f'<a:xfrm><a:off x="{_emu(x)}" y="{_emu(y)}"/>'
+        f'<a:ext cx="{_emu(width)}" cy="{_emu(height)}"/></a:xfrm>'
+    )
+
+
+def _paragraphs(lines, size=None, align=None):
+    run_props = f'<a:rPr lang="en-US" sz="{size * 100}"/>' if size else '<a:rPr lang="en-US"/>'
+    para_props = f'<a:pPr algn="{align}"/>' if align else ""
+    return "".join(
+        f"<a:p>{para_props}<a:r>{run_props}<a:t>{_text(line)}</a:t></a:r></a:p>"
+        for line in lines
+    ) or "<a:p/>"
+
+
+def _relationships(targets):
+    rels = "".join(
+        f'<Relationship Id="rId{i}" Type="{REL_TYPE}/{kind}" Target="{target}"/>'
+        for i, (kind, target) in enumerate(targets, start=1)
+    )
+    return f'{XML_HEADER}<Relationships xmlns="{REL_NS}">{rels}</Relationships>'
+
+
+def _shape_tree(shapes):
+    return (
+        '<p:cSld><p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/>'
+        '</p:nvGrpSpPr><p:grpSpPr/>' + "".join(shapes) + "</p:spTree></p:cSld>"
+    )
+
+
+def _placeholder(shape_id, name, kind, box, lines, index=None):
+    idx = f' idx="{index}"' if index is not None else ""
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="{name}"/>'
+        f'<p:cNvSpPr><a:spLocks noGrp="1"/></p:cNvSpPr>'
+        f'<p:nvPr><p:ph type="{kind}"{idx}/></p:nvPr></p:nvSpPr>'
+        f"<p:spPr>{_xfrm(*box)}</p:spPr>"
+        f"<p:txBody><a:bodyPr/><a:lstStyle/>{_paragraphs(lines)}</p:txBody></p:sp>"
+    )
+
+
+def _text_shape(shape_id, shape):
+    # The shape's position is its centre, as in the AppleScript templates' {x, y}
+    x = shape["x"] - shape["width"] // 2
+    y = shape["y"] - shape["height"] // 2
+    return (
+        f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="Shape {shape_id}"/>'
+        "<p:cNvSpPr/><p:nvPr/></p:nvSpPr>"
+        f'<p:spPr>{_xfrm(x, y, shape["width"], shape["height"])}'
+        '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr>'
+        '<p:txBody><a:bodyPr anchor="ctr"/><a:lstStyle/>'
+        f'{_paragraphs(shape["text"].splitlines() or [""], size=72, align="ctr")}'
+        "</p:txBody></p:sp>"
+    )
+
+
+def slide_xml(slide):
+    """Serialize one normalized slide (see slide_model)."""
+    shapes = [
+        _placeholder(2, "Title", "title", TITLE_BOX, [slide["title"]]),
+        _placeholder(3, "Body", "body", BODY_BOX, slide["bullets"], index=1),
+    ]
+    shapes += [
+        _text_shape(shape_id, shape)
+        for shape_id, shape in enumerate(slide["shapes"], start=4)
+    ]
+    return f"{XML_HEADER}<p:sld {NS}>{_shape_tree(shapes)}</p:sld>"
+
+
+THEME_XML = (
+    f'{XML_HEADER}<a:theme xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'name="Keynote MCP"><a:themeElements>'
+    '<a:clrScheme name="Keynote MCP">'
+    '<a:dk1><a:srgbClr val="000000"/></a:dk1><a:lt1><a:srgbClr val="FFFFFF"/></a:lt1>'
+    '<a:dk2><a:srgbClr val="1F2937"/></a:dk2><a:lt2><a:srgbClr val="F3F4F6"/></a:lt2>'
+    '<a:accent1><a:srgbClr val="2563EB"/></a:accent1><a:accent2><a:srgbClr val="DC2626"/></a:accent2>'
+    '<a:accent3><a:srgbClr val="16A34A"/></a:accent3><a:accent4><a:srgbClr val="9333EA"/></a:accent4>'
+    '<a:accent5><a:srgbClr val="EA580C"/></a:accent5><a:accent6><a:srgbClr val="0891B2"/></a:accent6>'
+    '<a:hlink><a:srgbClr val="2563EB"/></a:hlink><a:folHlink><a:srgbClr val="7C3AED"/></a:folHlink>'
+    "</a:clrScheme>"
+    '<a:fontScheme name="Keynote MCP">'
+    '<a:majorFont><a:latin typeface="Helvetica"/><a:ea typeface=""/><a:cs typeface=""/></a:majorFont>'
+    '<a:minorFont><a:latin typeface="Helvetica"/><a:ea typeface=""/><a:cs typeface=""/></a:minorFont>'
+    "</a:fontScheme>"
+    '<a:fmtScheme name="Keynote MCP">'
+    "<a:fillStyleLst>" + '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>' * 3 + "</a:fillStyleLst>"
+    "<a:lnStyleLst>"
+    + '<a:ln w="9525"><a:solidFill><a:schemeClr val="phClr"/></a:solidFill></a:ln>' * 3
+    + "</a:lnStyleLst>"
+    "<a:effectStyleLst>" + "<a:effectStyle><a:effectLst/></a:effectStyle>" * 3 + "</a:effectStyleLst>"
+    "<a:bgFillStyleLst>" + '<a:solidFill><a:schemeClr val="phClr"/></a:solidFill>' * 3 + "</a:bgFillStyleLst>"
+    "</a:fmtScheme></a:themeElements></a:theme>"
+)
+
+MASTER_XML = (
+    f"{XML_HEADER}<p:sldMaster {NS}>"
+    + _shape_tree([])
+    + '<p:clrMap bg1="lt1" tx1="dk1" bg2="lt2" tx2="dk2" accent1="accent1" accent2="accent2" '
+    'accent3="accent3" accent4="accent4" accent5="accent5" accent6="accent6" '
+    'hlink="hlink" folHlink="folHlink"/>'
+    '<p:sldLayoutIdLst><p:sldLayoutId id="2147483649" r:id="rId1"/></p:sldLayoutIdLst>'
+    "</p:sldMaster>"
+)
+
+LAYOUT_XML = (
+    f'{XML_HEADER}<p:sldLayout {NS} type="obj" preserve="1">'
+    + _shape_tree(
+        [
+            _placeholder(2, "Title", "title", TITLE_BOX, []),
+            _placeholder(3, "Body", "body", BODY_BOX, [], index=1),
+        ]
+    )
+    + '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sldLayout>'
+)
+
+
+def _presentation_xml(slide_count):
+    slide_ids = "".join(
+        f'<p:sldId id="{255 + n}" r:id="rId{n + 1}"/>' for n in range(1, slide_count + 1)
+    )
+    return (
+        f"{XML_HEADER}<p:presentation {NS}>"
+        '<p:sldMasterIdLst><p:sldMasterId id="2147483648" r:id="rId1"/></p:sldMasterIdLst>'
+        f"<p:sldIdLst>{slide_ids}</p:sldIdLst>"
+        f'<p:sldSz cx="{_emu(SLIDE_WIDTH)}" cy="{_emu(SLIDE_HEIGHT)}"/>'
+        '<p:notesSz cx="6858000" cy="9144000"/></p:presentation>'
+    )
+
+
+def _content_types(slide_count):
+    overrides = [
+        ("/ppt/presentation.xml", f"{CONTENT_TYPE}.presentation.main+xml"),
+        ("/ppt/slideMasters/slideMaster1.xml", f"{CONTENT_TYPE}.slideMaster+xml"),
+        ("/ppt/slideLayouts/slideLayout1.xml", f"{CONTENT_TYPE}.slideLayout+xml"),
+        ("/ppt/theme/theme1.xml", "application/vnd.openxmlformats-officedocument.theme+xml"),
+    ] + [
+        (f"/ppt/slides/slide{n}.xml", f"{CONTENT_TYPE}.slide+xml")
+        for n in range(1, slide_count + 1)
+    ]
+    return (
+        f'{XML_HEADER}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        + "".join(f'<Override PartName="{part}" ContentType="{kind}"/>' for part, kind in overrides)
+        + "</Types>"
+    )
+
+
+def render_pptx(slides, path):
+    """Write normalized slides to a PPTX file at path; returns the slide count."""
+    slide_rels = _relationships([("slideLayout", "../slideLayouts/slideLayout1.xml")])
+    count = 0
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+        for count, slide in enumerate(slides, start=1):
+            package.writestr(f"ppt/slides/slide{count}.xml", slide_xml(slide))
+            package.writestr(f"ppt/slides/_rels/slide{count}.xml.rels", slide_rels)
+
+        package.writestr("ppt/theme/theme1.xml", THEME_XML)
+        package.writestr("ppt/slideMasters/slideMaster1.xml", MASTER_XML)
+        package.writestr(
+            "ppt/slideMasters/_rels/slideMaster1.xml.rels",
+            _relationships(
+                [("slideLayout", "../slideLayouts/slideLayout1.xml"), ("theme", "../theme/theme1.xml")]
+            ),
+        )
+        package.writestr("ppt/slideLayouts/slideLayout1.xml", LAYOUT_XML)
+        package.writestr(
+            "ppt/slideLayouts/_rels/slideLayout1.xml.rels",
+            _relationships([("slideMaster", "../slideMasters/slideMaster1.xml")]),
+        )
+        package.writestr("ppt/presentation.xml", _presentation_xml(count))
+        package.writestr(
+            "ppt/_rels/presentation.xml.rels",
+            _relationships(
+                [("slideMaster", "slideMasters/slideMaster1.xml")]
+                + [("slide", f"slides/slide{n}.xml") for n in range(1, count + 1)]
+                + [("theme", "theme/theme1.xml")]
+            ),
+        )
+        package.writestr("_rels/.rels", _relationships([("officeDocument", "ppt/presentation.xml")]))
+        package.writestr("[Content_Types].xml", _content_types(count))
+    return count
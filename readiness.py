@@ -0,0 +1,33 @@
+"""Helpers for the readiness-polling handlers shared by the AppleScript templates.
+
+Templates wait with ``my wait_for(condition, target)`` (see
+``apple_prompt.READINESS_HANDLERS``) and return a ``WAITS:`` line listing how many
+milliseconds each wait took, e.g. ``WAITS:keynote_running=12,document_ready=340``.
+"""
+
+WAIT_REPORT_PREFIX = "WAITS:"
+
+
+def parse_wait_report(output):
+    """Return ``[(condition, seconds), ...]`` from a script's output, in wait order."""
+    for line in (output or "").splitlines():
+        line = line.strip()
+        if not line.startswith(WAIT_REPORT_PREFIX):
+            continue
+        waits = []
+        for item in line[len(WAIT_REPORT_PREFIX) :].split(","):
+            name, sep, millis = item.partition("=")
+            if not sep:
+                continue
+            try:
+                waits.append((name.strip(), int(millis) / 1000))
+            except ValueError:
+                continue
+        return waits
+    return []
+
+
+def format_waits(waits):
+    if not waits:
+        return "no waits"
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in waits)
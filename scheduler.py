@@ -0,0 +1,67 @@
+"""Scheduling of concurrent tool operations.
+
+Operations on different documents run in parallel, up to ``KEYNOTE_MAX_CONCURRENCY``
+at a time; operations on the same document (keyed by its output path) run one after
+another in arrival order. The scheduler is module-level in the server, so its locks
+and semaphore are kept per event loop.
+"""
+
+import asyncio
+import os
+
+from llm_controller import PerLoop
+
+
+class _LoopState:
+    def __init__(self, max_concurrency):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.locks = {}
+        self.users = {}
+
+
+class DocumentScheduler:
+    def __init__(self, max_concurrency=None):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("KEYNOTE_MAX_CONCURRENCY", "2"))
+        self.max_concurrency = max(1, max_concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self._states = PerLoop(lambda: _LoopState(self.max_concurrency))
+
+    async def run(self, document, operation):
+        """Run ``await operation()`` once the document and a concurrency slot are free."""
+        state = self._states.get()
+        lock = state.locks.setdefault(document, asyncio.Lock())
+        state.users[document] = state.users.get(document, 0) + 1
+        self.waiting += 1
+        started = False
+        try:
+            # Take the document lock first, so operations queued behind another
+            # operation on the same document do not hold a concurrency slot.
+            async with lock:
+                async with state.semaphore:
+                    self.waiting -= 1
+                    self.running += 1
+                    started = True
+                    try:
+                        return await operation()
+                    finally:
+                        self.running -= 1
+                        self.completed += 1
+        finally:
+            if not started:
+                self.waiting -= 1
+            state.users[document] -= 1
+            if not state.users[document]:
+                del state.users[document]
+                del state.locks[document]
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "documents": sum(len(state.locks) for state in self._states.values()),
+        }
@@ -0,0 +1,394 @@
+"""Script executors for running AppleScript against Keynote.
+
+Two backends are available:
+
+- ``subprocess``: one ``osascript`` process per script, fed over stdin (no temp files).
+- ``pool``: a small pool of long-lived ``osascript`` workers that receive scripts over
+  a pipe, so process spawn cost is paid once per worker instead of once per script.
+
+The backend is chosen with ``KEYNOTE_SCRIPT_BACKEND`` and the osascript command with
+``KEYNOTE_OSASCRIPT`` (point it at ``python fake_osascript.py`` to run on Linux).
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+
+DEFAULT_TIMEOUT = float(os.getenv("KEYNOTE_SCRIPT_TIMEOUT", "120"))
+
+# JXA loop run by every pool worker: one JSON request per stdin line, one JSON reply
+# per stdout line. Scripts are executed in-process through OSAKit.
+WORKER_SOURCE = r"""
+ObjC.import('Foundation');
+ObjC.import('OSAKit');
+
+function reply(obj) {
+    var line = $(JSON.stringify(obj) + '\n');
+    $.NSFileHandle.fileHandleWithStandardOutput.writeData(
+        line.dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function errorReply(id, error) {
+    var info = error[0];
+    return {
+        id: id,
+        ok: false,
+        result: '',
+        error: ObjC.unwrap(info.objectForKey($.OSAScriptErrorMessageKey)) || 'script error',
+        errorNumber: ObjC.unwrap(info.objectForKey($.OSAScriptErrorNumberKey)) || 1
+    };
+}
+
+// Compiled scripts stay loaded for the lifetime of the worker, keyed by path.
+var loaded = {};
+
+function loadScript(req, error) {
+    if (!req.path) return $.OSAScript.alloc.initWithSource(req.source);
+    if (!loaded[req.path]) {
+        var url = $.NSURL.fileURLWithPath(req.path);
+        var script = $.OSAScript.alloc.initWithContentsOfURLError(url, error);
+        if (!script || script.isNil()) return null;
+        loaded[req.path] = script;
+    }
+    return loaded[req.path];
+}
+
+function execute(req) {
+    var error = Ref();
+    var script = loadScript(req, error);
+    if (!script) return errorReply(req.id, error);
+    var result;
+    if (req.path || (req.args && req.args.length)) {
+        result = script.executeHandlerWithNameArgumentsError('run', [$(req.args || [])], error);
+    } else {
+        result = script.executeAndReturnError(error);
+    }
+    if (!result || result.isNil()) {
+        if (error[0] && !error[0].isNil()) return errorReply(req.id, error);
+        return {id: req.id, ok: true, result: ''};
+    }
+    return {id: req.id, ok: true, result: ObjC.unwrap(result.stringValue) || ''};
+}
+
+function run(argv) {
+    var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+    var buffer = '';
+    while (true) {
+        var data = stdin.availableData;
+        if (data.length == 0) break;
+        buffer += ObjC.unwrap($.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding));
+        var idx;
+        while ((idx = buffer.indexOf('\n')) >= 0) {
+            var line = buffer.slice(0, idx);
+            buffer = buffer.slice(idx + 1);
+            if (!line) continue;
+            var req = JSON.parse(line);
+            try {
+                reply(execute(req));
+            } catch (e) {
+                reply({id: req.id, ok: false, result: '', error: String(e), errorNumber: 1});
+            }
+        }
+    }
+}
+"""
+
+
+@dataclass
+class ScriptResult:
+    """Outcome of a single script execution."""
+
+    returncode: int
+    stdout: str = ""
+    stderr: str = ""
+    elapsed: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+
+def osascript_command():
+    """Command used to launch osascript; KEYNOTE_OSASCRIPT overrides it."""
+    return shlex.split(os.getenv("KEYNOTE_OSASCRIPT", "osascript"))
+
+
+class SubprocessExecutor:
+    """Run each script in a fresh osascript process, passing the source on stdin."""
+
+    name = "subprocess"
+
+    def __init__(self, command=None):
+        self.command = command or osascript_command()
+
+    def run(self, script, args=(), timeout=None):
+        return self._invoke(["-", *[str(a) for a in args]], script, timeout)
+
+    def run_compiled(self, path, args=(), timeout=None):
+        return self._invoke([path, *[str(a) for a in args]], None, timeout)
+
+    async def run_async(self, script, args=(), timeout=None):
+        return await self._invoke_async(["-", *[str(a) for a in args]], script, timeout)
+
+    async def run_compiled_async(self, path, args=(), timeout=None):
+        return await self._invoke_async([path, *[str(a) for a in args]], None, timeout)
+
+    async def _invoke_async(self, argv, script, timeout):
+        timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            *argv,
+            stdin=subprocess.PIPE if script is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        data = script.encode("utf-8") if script is not None else None
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(data), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return ScriptResult(
+                returncode=-1,
+                stderr=f"Script timed out after {timeout}s",
+                elapsed=time.perf_counter() - start,
+                timed_out=True,
+            )
+        return ScriptResult(
+            returncode=process.returncode,
+            stdout=stdout.decode("utf-8", "replace").strip(),
+            stderr=stderr.decode("utf-8", "replace").strip(),
+            elapsed=time.perf_counter() - start,
+        )
+
+    def _invoke(self, argv, script, timeout):
+        timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        # Never let osascript inherit our stdin: on the stdio transport it is the
+        # MCP channel.
+        stdin = {"input": script} if script is not None else {"stdin": subprocess.DEVNULL}
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                self.command + argv,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                **stdin,
+            )
+        except subprocess.TimeoutExpired:
+            return ScriptResult(
+                returncode=-1,
+                stderr=f"Script timed out after {timeout}s",
+                elapsed=time.perf_counter() - start,
+                timed_out=True,
+            )
+        return ScriptResult(
+            returncode=completed.returncode,
+            stdout=completed.stdout.strip(),
+            stderr=completed.stderr.strip(),
+            elapsed=time.perf_counter() - start,
+        )
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name}
+
+
+class _Worker:
+    """One long-lived osascript process speaking the JSON-lines worker protocol."""
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+        self.responses = None
+        self.restarts = 0
+        self._ids = itertools.count(1)
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        # Each process generation gets its own queue so replies from a killed
+        # worker can never be mistaken for replies from its replacement.
+        self.responses = queue.Queue()
+        threading.Thread(
+            target=self._read, args=(self.process, self.responses), daemon=True
+        ).start()
+
+    @staticmethod
+    def _read(process, responses):
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                responses.put(json.loads(line))
+            except ValueError:
+                continue
+        responses.put(None)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        self.process = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+        self.restarts += 1
+
+    def execute(self, request, timeout):
+        if self.process is None:
+            self.start()
+        elif not self.alive():
+            self.restart()
+
+        request = dict(request, id=next(self._ids))
+        start = time.perf_counter()
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.restart()
+            return ScriptResult(
+                returncode=-1,
+                stderr=f"Worker pipe closed: {e}",
+                elapsed=time.perf_counter() - start,
+            )
+
+        deadline = start + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                reply = self.responses.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                # The script is stuck; the only way to interrupt it is to kill the worker.
+                self.restart()
+                return ScriptResult(
+                    returncode=-1,
+                    stderr=f"Script timed out after {timeout}s",
+                    elapsed=time.perf_counter() - start,
+                    timed_out=True,
+                )
+            if reply is None:
+                self.restart()
+                return ScriptResult(
+                    returncode=-1,
+                    stderr="Worker exited while running script",
+                    elapsed=time.perf_counter() - start,
+                )
+            if reply.get("id") != request["id"]:
+                continue
+            return ScriptResult(
+                returncode=0 if reply.get("ok") else int(reply.get("errorNumber") or 1),
+                stdout=str(reply.get("result") or "").strip(),
+                stderr=str(reply.get("error") or "").strip(),
+                elapsed=time.perf_counter() - start,
+            )
+
+
+class PooledExecutor:
+    """Dispatch scripts to a fixed pool of long-lived osascript workers."""
+
+    name = "pool"
+
+    def __init__(self, size=None, command=None):
+        size = size or int(os.getenv("KEYNOTE_POOL_SIZE", "2"))
+        command = command or osascript_command()
+        self.command = command + ["-l", "JavaScript", "-e", WORKER_SOURCE]
+        self.workers = [_Worker(self.command) for _ in range(max(1, size))]
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+
+    def _execute(self, request, timeout):
+        timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        worker = self._idle.get()
+        try:
+            return worker.execute(request, timeout)
+        finally:
+            self._idle.put(worker)
+
+    def run(self, script, args=(), timeout=None):
+        return self._execute(
+            {"source": script, "args": [str(a) for a in args]}, timeout
+        )
+
+    def run_compiled(self, path, args=(), timeout=None):
+        return self._execute({"path": path, "args": [str(a) for a in args]}, timeout)
+
+    # Workers are driven by blocking pipe reads, so the async API hands the wait
+    # to a thread; callers bound how many are in flight (see scheduler.py).
+    async def run_async(self, script, args=(), timeout=None):
+        return await asyncio.to_thread(self.run, script, args, timeout)
+
+    async def run_compiled_async(self, path, args=(), timeout=None):
+        return await asyncio.to_thread(self.run_compiled, path, args, timeout)
+
+    def start(self):
+        """Launch every worker now instead of on its first script."""
+        for worker in self.workers:
+            if worker.process is None:
+                worker.start()
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def stats(self):
+        return {
+            "backend": self.name,
+            "workers": len(self.workers),
+            "alive": sum(1 for worker in self.workers if worker.alive()),
+            "restarts": sum(worker.restarts for worker in self.workers),
+        }
+
+
+BACKENDS = {
+    SubprocessExecutor.name: SubprocessExecutor,
+    PooledExecutor.name: PooledExecutor,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def create_executor(backend=None):
+    backend = backend or os.getenv("KEYNOTE_SCRIPT_BACKEND", PooledExecutor.name)
+    try:
+        factory = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown script backend '{backend}', expected one of {sorted(BACKENDS)}"
+        )
+    return factory()
+
+
+def get_executor():
+    """Return the process-wide executor, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = create_executor()
+        return _executor
@@ -0,0 +1,137 @@
+"""Registry of precompiled AppleScript templates.
+
+Every template in ``apple_prompt.TEMPLATES`` is prefixed with the shared readiness
+and deck handlers and compiled once with ``osacompile`` into
+a ``.scpt`` file named after a hash of its source. Calls pass their values as script
+arguments, so repeated tool calls reuse the compiled script instead of compiling new
+source each time.
+"""
+
+import asyncio
+import hashlib
+import os
+import shlex
+import subprocess
+import threading
+
+from apple_prompt import DECK_HANDLERS, TEMPLATES, get_readiness_handlers
+from script_executor import get_executor
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "keynotemcp", "scripts"
+)
+
+
+class TemplateCompileError(RuntimeError):
+    pass
+
+
+def osacompile_command():
+    """Command used to compile scripts; KEYNOTE_OSACOMPILE overrides it."""
+    return shlex.split(os.getenv("KEYNOTE_OSACOMPILE", "osacompile"))
+
+
+def template_hash(source):
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+class TemplateRegistry:
+    """Compile templates on first use and hand out the cached ``.scpt`` paths."""
+
+    def __init__(self, templates=None, prelude="", cache_dir=None, compiler=None):
+        self.prelude = prelude
+        self.cache_dir = cache_dir or os.getenv("KEYNOTE_SCRIPT_CACHE", DEFAULT_CACHE_DIR)
+        self.compiler = compiler or osacompile_command()
+        self.templates = {}
+        self.hits = 0
+        self.compiles = 0
+        self._compiled = {}
+        self._lock = threading.Lock()
+        for name, source in (templates or {}).items():
+            self.register(name, source)
+
+    def register(self, name, source):
+        self.templates[name] = source
+        self._compiled.pop(name, None)
+
+    def source(self, name):
+        """Full script source for ``name``, including the shared prelude."""
+        return self.prelude + self.templates[name]
+
+    def version(self, name):
+        """Hash identifying the current source of a template."""
+        return template_hash(self.source(name))
+
+    def compiled_path(self, name):
+        """Return the compiled script for ``name``, compiling it if needed."""
+        with self._lock:
+            path = self._compiled.get(name)
+            if path:
+                self.hits += 1
+                return path
+            source = self.source(name)
+            path = os.path.join(self.cache_dir, f"{name}-{template_hash(source)}.scpt")
+            if os.path.exists(path):
+                self.hits += 1
+            else:
+                self._compile(source, path)
+                self.compiles += 1
+            self._compiled[name] = path
+            return path
+
+    def _compile(self, source, path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # osacompile picks the output format from the extension, so keep ".scpt".
+        tmp_path = f"{path[:-5]}.{os.getpid()}.tmp.scpt"
+        try:
+            completed = subprocess.run(
+                self.compiler + ["-o", tmp_path],
+                input=source,
+                capture_output=True,
+                text=True,
+            )
+        except OSError as e:
+            raise TemplateCompileError(f"Could not run {self.compiler[0]}: {e}")
+        if completed.returncode != 0:
+            raise TemplateCompileError(
+                f"Compiling {os.path.basename(path)} failed: {completed.stderr.strip()}"
+            )
+        os.replace(tmp_path, path)
+
+    def run(self, name, args=(), executor=None, timeout=None):
+        """Run a template with ``args`` passed to its ``on run argv`` handler."""
+        executor = executor or get_executor()
+        return executor.run_compiled(self.compiled_path(name), args, timeout=timeout)
+
+    async def run_async(self, name, args=(), executor=None, timeout=None):
+        executor = executor or get_executor()
+        if name in self._compiled:
+            path = self.compiled_path(name)
+        else:
+            # First use may have to run osacompile; keep that off the event loop.
+            path = await asyncio.to_thread(self.compiled_path, name)
+        return await executor.run_compiled_async(path, args, timeout=timeout)
+
+    def stats(self):
+        return {
+            "templates": len(self.templates),
+            "compiles": self.compiles,
+            "hits": self.hits,
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide registry holding the apple_prompt templates."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            prelude = get_readiness_handlers(
+                poll_interval=os.getenv("KEYNOTE_POLL_INTERVAL", "0.05"),
+                wait_timeout=os.getenv("KEYNOTE_WAIT_TIMEOUT", "10"),
+            ) + DECK_HANDLERS
+            _registry = TemplateRegistry(TEMPLATES, prelude=prelude)
+        return _registry
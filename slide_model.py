@@ -0,0 +1,67 @@
+"""Slide model shared by the deck-building tools.
+
+A deck is a list of slides. Each slide is normalized to::
+
+    {"title": str, "bullets": [str, ...], "shapes": [{"text", "width", "height", "x", "y"}]}
+
+Callers (usually an LLM) may be loose: a bare string is a title-only slide, and
+bullets may also arrive as ``content``/``body``, either as a list or as text with one
+bullet per line.
+"""
+
+SHAPE_DEFAULTS = {"text": "", "width": 540, "height": 430, "x": 400, "y": 540}
+
+
+def normalize_shape(shape):
+    if isinstance(shape, str):
+        shape = {"text": shape}
+    if not isinstance(shape, dict):
+        raise ValueError(f"Shape must be an object or a string, got {type(shape).__name__}")
+    normalized = dict(SHAPE_DEFAULTS)
+    normalized["text"] = str(shape.get("text", SHAPE_DEFAULTS["text"]))
+    for key in ("width", "height", "x", "y"):
+        try:
+            normalized[key] = int(float(shape.get(key, SHAPE_DEFAULTS[key])))
+        except (TypeError, ValueError):
+            raise ValueError(f"Shape {key} must be a number, got {shape.get(key)!r}")
+    return normalized
+
+
+def normalize_slide(slide):
+    if isinstance(slide, str):
+        return {"title": slide, "bullets": [], "shapes": []}
+    if not isinstance(slide, dict):
+        raise ValueError(f"Slide must be an object or a string, got {type(slide).__name__}")
+    bullets = slide.get("bullets", slide.get("content", slide.get("body", [])))
+    if isinstance(bullets, str):
+        bullets = [line.strip() for line in bullets.splitlines() if line.strip()]
+    shapes = slide.get("shapes", [])
+    if not isinstance(shapes, list):
+        shapes = [shapes]
+    return {
+        "title": str(slide.get("title", "")),
+        "bullets": [str(b) for b in bullets or []],
+        "shapes": [normalize_shape(shape) for shape in shapes],
+    }
+
+
+def normalize_slides(slides):
+    if not isinstance(slides, list) or not slides:
+        raise ValueError("slides must be a non-empty list")
+    return [normalize_slide(slide) for slide in slides]
+
+
+def encode_slide_args(slide):
+    """Flatten one slide into the argument stream read by the outline templates:
+    title, bullets (one per line), shape count, then text/width/height/x/y per shape."""
+    args = [slide["title"], "\n".join(slide["bullets"]), len(slide["shapes"])]
+    for shape in slide["shapes"]:
+        args += [shape["text"], shape["width"], shape["height"], shape["x"], shape["y"]]
+    return args
+
+
+def encode_slides_args(slides):
+    args = [len(slides)]
+    for slide in slides:
+        args += encode_slide_args(slide)
+    return args
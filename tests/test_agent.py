@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+from agent import AgentRun
+
+
+class StubSession:
+    """Records when each call runs; create calls are slower than updates."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.events = []
+        self.running = 0
+        self.peak = 0
+
+    async def call_tool(self, name, arguments):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.events.append(("start", name, arguments.get("output_path")))
+        try:
+            await asyncio.sleep(0.05 if name.startswith("create") else 0.01)
+            if name in self.fail:
+                raise RuntimeError(f"{name} failed")
+        finally:
+            self.running -= 1
+            self.events.append(("end", name, arguments.get("output_path")))
+        return SimpleNamespace(content=[SimpleNamespace(text=f"{name} ok")])
+
+
+def execute(session, calls, max_parallel_calls=4):
+    run = AgentRun(session, [], "", "query", max_parallel_calls=max_parallel_calls)
+    ok = asyncio.run(run.execute_calls(calls))
+    return ok, run
+
+
+def test_calls_on_one_deck_run_in_the_models_order():
+    session = StubSession()
+    calls = [
+        ("create_presentation_from_outline", {"slides": [], "output_path": "/d/a.key"}),
+        ("update_presentation", {"slides": [], "output_path": "/d/a.key"}),
+        ("create_presentation_from_outline", {"slides": [], "output_path": "/d/b.key"}),
+    ]
+    ok, _ = execute(session, calls)
+    assert ok
+    on_a = [event[:2] for event in session.events if event[2] == "/d/a.key"]
+    assert on_a == [
+        ("start", "create_presentation_from_outline"),
+        ("end", "create_presentation_from_outline"),
+        ("start", "update_presentation"),
+        ("end", "update_presentation"),
+    ]
+    # Other decks do not wait for it
+    assert session.peak == 2
+
+
+def test_parallel_calls_are_capped():
+    session = StubSession()
+    calls = [("create_keynote_with_text", {"text": str(n)}) for n in range(6)]
+    ok, run = execute(session, calls, max_parallel_calls=2)
+    assert ok
+    assert session.peak == 2
+    assert len(run.context.entries) == 6
+
+
+def test_failed_call_skips_later_calls_on_the_same_deck():
+    session = StubSession(fail={"create_presentation_from_outline"})
+    calls = [
+        ("create_presentation_from_outline", {"slides": [], "output_path": "/d/a.key"}),
+        ("update_presentation", {"slides": [], "output_path": "/d/a.key"}),
+    ]
+    ok, run = execute(session, calls)
+    assert not ok
+    assert [event[1] for event in session.events if event[0] == "start"] == [
+        "create_presentation_from_outline"
+    ]
+    assert "skipped" in run.context.entries[1]
+
+
+class StubStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield SimpleNamespace(text=chunk)
+
+    def close(self):
+        pass
+
+
+def stream(chunks, monkeypatch):
+    import agent
+
+    monkeypatch.setattr(agent.llm_cache, "enabled", False)
+    models = SimpleNamespace(generate_content_stream=lambda **_: StubStream(chunks))
+    return asyncio.run(agent.stream_directive(SimpleNamespace(models=models), "p"))
+
+
+def test_stream_keeps_consecutive_function_calls(monkeypatch):
+    directives = stream(
+        ["FUNCTION_CALL: a|1\nFUNCTION_", "CALL: b|2\n", "Done.\n", "FUNCTION_CALL: c"],
+        monkeypatch,
+    )
+    assert directives == "FUNCTION_CALL: a|1\nFUNCTION_CALL: b|2"
+
+
+def test_stream_final_answer_and_trailing_calls(monkeypatch):
+    assert stream(["Thinking\nFINAL_ANSWER: [ok]\nmore"], monkeypatch) == (
+        "FINAL_ANSWER: [ok]"
+    )
+    assert stream(["FUNCTION_CALL: a|1\n\nFUNCTION_CALL: b"], monkeypatch) == (
+        "FUNCTION_CALL: a|1\nFUNCTION_CALL: b"
+    )
+    assert stream(["no directive"], monkeypatch) == ""
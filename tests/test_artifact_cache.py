@@ -0,0 +1,59 @@
+import os
+import time
+
+from artifact_cache import ArtifactCache
+
+
+def make_deck(tmp_path, name, size=100):
+    path = tmp_path / "out" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_hit_materializes_a_copy(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path / "cache"), max_bytes=10_000, max_age=60)
+    assert cache.put("a", {"deck": make_deck(tmp_path, "a.key")})
+    dest = str(tmp_path / "copy" / "a.key")
+    assert cache.get("a", {"deck": dest})
+    assert open(dest, "rb").read() == b"x" * 100
+    assert not cache.get("b", {"deck": dest})
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ArtifactCache(root=str(tmp_path / "cache"), max_bytes=250, max_age=60)
+    cache.put("a", {"deck": make_deck(tmp_path, "a.key")})
+    cache.put("b", {"deck": make_deck(tmp_path, "b.key")})
+    # Touch a so that b is the oldest when c pushes the cache over its limit
+    time.sleep(0.01)
+    assert cache.get("a", {"deck": str(tmp_path / "a-copy.key")})
+    cache.put("c", {"deck": make_deck(tmp_path, "c.key")})
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert not cache.get("b", {"deck": str(tmp_path / "b-copy.key")})
+
+
+def test_instances_sharing_a_root_keep_each_others_entries(tmp_path):
+    root = str(tmp_path / "cache")
+    first = ArtifactCache(root=root, max_bytes=10_000, max_age=60)
+    second = ArtifactCache(root=root, max_bytes=10_000, max_age=60)
+    first.put("a", {"deck": make_deck(tmp_path, "a.key")})
+    second.put("b", {"deck": make_deck(tmp_path, "b.key")})
+    first.put("c", {"deck": make_deck(tmp_path, "c.key")})
+    assert second.stats()["entries"] == 3
+    assert second.get("a", {"deck": str(tmp_path / "a-copy.key")})
+
+
+def test_orphaned_entries_are_removed(tmp_path):
+    root = tmp_path / "cache"
+    cache = ArtifactCache(root=str(root), max_bytes=10_000, max_age=60)
+    orphan = root / "objects" / "orphan"
+    orphan.mkdir(parents=True)
+    (orphan / "deck.key").write_bytes(b"x")
+    in_progress = root / "objects" / "key.0123.tmp"
+    in_progress.mkdir()
+    cache.put("a", {"deck": make_deck(tmp_path, "a.key")})
+    assert not orphan.exists()
+    assert in_progress.exists()
+    assert sorted(os.listdir(root / "objects")) == ["a", "key.0123.tmp"]
@@ -0,0 +1,34 @@
+from conversation_context import ConversationContext, shorten
+from llm_controller import estimate_tokens
+
+
+def test_shorten_keeps_head_and_tail():
+    text = "a" * 50 + "b" * 50
+    short = shorten(text, 40)
+    assert len(short) <= 40
+    assert short == "a" * 10 + " ...[87 chars omitted]... " + "b" * 3
+    assert shorten("short", 40) == "short"
+
+
+def test_recent_entries_verbatim_older_as_summaries():
+    context = ConversationContext(keep_recent=2, result_chars=1000, max_tokens=1000)
+    for n in range(4):
+        context.add(f"Step {n} called a tool and got result {n}.", f"step {n}")
+    assert context.render() == (
+        "Earlier steps: step 0; step 1. "
+        "Step 2 called a tool and got result 2. Step 3 called a tool and got result 3."
+    )
+
+
+def test_render_stays_within_the_token_budget():
+    context = ConversationContext(keep_recent=4, result_chars=2000, max_tokens=100)
+    for n in range(50):
+        context.add(f"Step {n}: " + "x" * 1500, f"step {n} summary")
+    text = context.render()
+    assert estimate_tokens(text) <= 100
+    assert "earlier steps omitted" in text
+    assert "step 49" in text or "Step 49" in text
+
+
+def test_empty_context():
+    assert ConversationContext().render() == ""
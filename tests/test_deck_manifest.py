@@ -0,0 +1,70 @@
+import os
+import random
+
+import pytest
+
+from deck_manifest import ManifestStore, diff_slides
+
+
+def apply(slides, ops):
+    """Apply diff_slides operations the way the update_deck script does."""
+    deck = list(slides)
+    for op in ops:
+        if op[0] == "insert":
+            deck.insert(op[1] - 1, op[2])
+        else:
+            assert 1 <= op[1] <= len(deck)
+            del deck[op[1] - 1]
+        # Keynote cannot delete the last slide
+        assert deck
+    return deck
+
+
+def slide(title):
+    return {"title": title, "bullets": []}
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ("abc", "abc"),
+        ("abc", "abcd"),
+        ("abc", "xabc"),
+        ("abc", "ac"),
+        ("abc", "axc"),
+        ("a", "x"),
+        ("abc", "xyz"),
+        ("abcde", "aXcYe"),
+        ("ab", "bxa"),
+        ("abcdef", "b"),
+    ],
+)
+def test_ops_turn_old_into_new(old, new):
+    old, new = [slide(t) for t in old], [slide(t) for t in new]
+    assert apply(old, diff_slides(old, new)) == new
+
+
+def test_unchanged_deck_needs_no_ops():
+    slides = [slide("a"), slide("b")]
+    assert diff_slides(slides, [dict(s) for s in slides]) == []
+
+
+def test_random_edits():
+    rng = random.Random(7)
+    for _ in range(200):
+        old = [slide(rng.choice("abcdef")) for _ in range(rng.randint(1, 8))]
+        new = [slide(rng.choice("abcdef")) for _ in range(rng.randint(1, 8))]
+        assert apply(old, diff_slides(old, new)) == new
+
+
+def test_manifest_goes_stale_when_the_deck_changes(tmp_path):
+    deck = tmp_path / "deck.key"
+    deck.write_bytes(b"deck")
+    store = ManifestStore(root=str(tmp_path / "manifests"))
+    store.put(str(deck), [slide("a")])
+    assert store.get(str(deck)) == [slide("a")]
+    deck.write_bytes(b"edited by hand")
+    assert store.get(str(deck)) is None
+    assert store.stats()["stale"] == 1
+    os.remove(deck)
+    assert store.get(str(deck)) is None
@@ -0,0 +1,45 @@
+from directive_parser import DirectiveParser
+
+
+def feed_all(chunks):
+    parser = DirectiveParser()
+    directives = []
+    for chunk in chunks:
+        directives.extend(parser.feed(chunk))
+    return directives + parser.finish(), parser
+
+
+def test_directive_split_across_chunks():
+    directives, _ = feed_all(["Thinking...\nFUNCTION_", 'CALL: create|{"a"', ": 1}\n"])
+    assert directives == ['FUNCTION_CALL: create|{"a": 1}']
+
+
+def test_directive_is_returned_when_its_line_ends():
+    parser = DirectiveParser()
+    assert parser.feed("FINAL_ANSWER: done") == []
+    assert parser.feed("\nmore text") == ["FINAL_ANSWER: done"]
+    assert parser.lines == 1
+
+
+def test_last_line_without_newline():
+    directives, parser = feed_all(["intro\n", "  FINAL_ANSWER: [42]  "])
+    assert directives == ["FINAL_ANSWER: [42]"]
+    assert parser.lines == 2
+
+
+def test_several_directives_in_one_chunk():
+    directives, _ = feed_all(["FUNCTION_CALL: a\nnote\nFUNCTION_CALL: b\n"])
+    assert directives == ["FUNCTION_CALL: a", "FUNCTION_CALL: b"]
+
+
+def test_no_directive():
+    directives, parser = feed_all(["just ", "prose\n", ""])
+    assert directives == []
+    assert parser.finish() == []
+
+
+def test_feed_lines_returns_every_completed_line():
+    parser = DirectiveParser()
+    assert parser.feed_lines("a\n  FINAL_ANSWER: x  \nb") == ["a", "FINAL_ANSWER: x"]
+    assert parser.finish_lines() == ["b"]
+    assert parser.finish_lines() == []
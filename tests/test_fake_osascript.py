@@ -0,0 +1,72 @@
+import pytest
+
+from apple_prompt import (
+    DECK_HANDLERS,
+    TEMPLATES,
+    get_create_keynote_args,
+    get_create_outline_args,
+    get_import_deck_args,
+    get_readiness_handlers,
+    get_update_deck_args,
+)
+from fake_osascript import simulate
+from readiness import parse_wait_report
+
+PRELUDE = get_readiness_handlers() + DECK_HANDLERS
+SLIDE = {"title": "Intro", "bullets": ["One"], "shapes": []}
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setenv("FAKE_OSASCRIPT_LATENCY", "0")
+    monkeypatch.setenv("FAKE_OSASCRIPT_SAVE_LATENCY", "0.01")
+
+
+def waits(name, args):
+    code, out, _ = simulate(PRELUDE + TEMPLATES[name], args)
+    assert code == 0
+    return [(condition, round(seconds, 2)) for condition, seconds in parse_wait_report(out)]
+
+
+def test_create_keynote(tmp_path):
+    deck = str(tmp_path / "a.key")
+    assert waits("create_keynote", get_create_keynote_args(output_path=deck)) == [
+        ("keynote_running", 0),
+        ("document_ready", 0),
+        ("file_written", 0.01),
+    ]
+
+
+def test_create_outline_with_pdf_export(tmp_path):
+    deck, pdf = str(tmp_path / "a.key"), str(tmp_path / "a.pdf")
+    args = get_create_outline_args([SLIDE], deck, "pdf", pdf)
+    assert waits("create_outline", args) == [
+        ("keynote_running", 0),
+        ("document_ready", 0),
+        ("file_written", 0.01),
+        ("file_written", 0),
+    ]
+
+
+def test_import_deck_with_png_export(tmp_path):
+    args = get_import_deck_args(
+        str(tmp_path / "a.pptx"), str(tmp_path / "a.key"), "png", str(tmp_path / "png")
+    )
+    assert waits("import_deck", args)[-2:] == [("file_written", 0.01), ("path_exists", 0)]
+
+
+def test_update_deck(tmp_path):
+    args = get_update_deck_args(str(tmp_path / "a.key"), [("insert", 1, SLIDE)])
+    assert waits("update_deck", args) == [
+        ("keynote_running", 0),
+        ("document_ready", 0),
+        ("file_written", 0.01),
+    ]
+
+
+def test_launch_keynote_does_not_save():
+    assert waits("launch_keynote", []) == [("keynote_running", 0)]
+
+
+def test_quit_keynote_reports_no_waits():
+    assert simulate(PRELUDE + TEMPLATES["quit_keynote"], []) == (0, "", "")
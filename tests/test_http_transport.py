@@ -0,0 +1,100 @@
+import asyncio
+
+from http_transport import ClientLimiter
+
+
+class GatedApp:
+    """ASGI app whose requests finish only once the gate opens."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.started = 0
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        await self.gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def request(limiter, session="s1", method="POST"):
+    scope = {
+        "type": "http",
+        "method": method,
+        "headers": [(b"mcp-session-id", session.encode())],
+        "client": ("127.0.0.1", 5000),
+    }
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def call():
+        await limiter(scope, receive, send)
+        return statuses[0]
+
+    return asyncio.create_task(call())
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_per_client_limit_queues_then_rejects():
+    async def main():
+        app = GatedApp()
+        limiter = ClientLimiter(app, per_client=1, max_waiting=1)
+        first, queued = request(limiter), request(limiter)
+        await settle()
+        rejected = await request(limiter)
+        other_client = request(limiter, session="s2")
+        await settle()
+        assert app.started == 2  # s1's first request and s2's
+        app.gate.set()
+        return rejected, await first, await queued, await other_client, limiter.stats()
+
+    rejected, first, queued, other, stats = asyncio.run(main())
+    assert (rejected, first, queued, other) == (429, 200, 200, 200)
+    assert stats["queued"] == 1
+    assert stats["rejected"] == 1
+    assert stats["requests"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["clients"] == 0
+
+
+def test_draining_refuses_new_requests_and_waits_for_running_ones():
+    async def main():
+        app = GatedApp()
+        limiter = ClientLimiter(app, per_client=4)
+        running = request(limiter)
+        await settle()
+        drain = asyncio.create_task(limiter.drain(timeout=5))
+        await settle()
+        refused = await request(limiter, session="s2")
+        stream = request(limiter, method="GET")  # event streams pass through
+        await settle()
+        assert not drain.done()
+        app.gate.set()
+        return refused, await running, await stream, await drain, limiter.stats()
+
+    refused, running, stream, drained, stats = asyncio.run(main())
+    assert (refused, running, stream) == (503, 200, 200)
+    assert drained
+    assert stats["refused_draining"] == 1
+
+
+def test_drain_times_out_while_requests_still_run():
+    async def main():
+        limiter = ClientLimiter(GatedApp(), per_client=1)
+        running = request(limiter)
+        await settle()
+        drained = await limiter.drain(timeout=0.05)
+        running.cancel()
+        return drained
+
+    assert asyncio.run(main()) is False
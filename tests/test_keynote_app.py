@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+from keynote_app import KeynoteAppManager
+from script_executor import ScriptResult
+
+
+class StubRegistry:
+    """Pretends to be Keynote: scripts fail with -600 while it is not running."""
+
+    def __init__(self, quit_output="QUIT:done"):
+        self.quit_output = quit_output
+        self.keynote_running = False
+        self.quitting = threading.Event()
+        self.release_quit = threading.Event()
+        self.release_quit.set()
+        self.log = []
+
+    def run(self, name, args=(), timeout=None):
+        self.log.append(name)
+        if name == "launch_keynote":
+            self.keynote_running = True
+        elif name == "quit_keynote":
+            self.quitting.set()
+            self.release_quit.wait()
+            if self.quit_output == "QUIT:done":
+                self.keynote_running = False
+            return ScriptResult(0, stdout=self.quit_output)
+        return ScriptResult(0)
+
+    async def run_async(self, name, args=(), timeout=None):
+        self.log.append(name)
+        if not self.keynote_running:
+            return ScriptResult(-600, stderr="Application isn't running (-600)")
+        return ScriptResult(0)
+
+
+def test_script_during_idle_quit_waits_and_relaunches():
+    registry = StubRegistry()
+    manager = KeynoteAppManager(registry=registry, idle_timeout=0)
+
+    async def main():
+        await manager.run_async("create_outline")
+        registry.release_quit.clear()
+        quit = asyncio.create_task(asyncio.to_thread(manager.shutdown))
+        await asyncio.to_thread(registry.quitting.wait)
+        script = asyncio.create_task(manager.run_async("create_outline"))
+        try:
+            await asyncio.sleep(0.05)
+            assert not script.done()
+        finally:
+            registry.release_quit.set()
+        return await quit, await script
+
+    quit_ok, result = asyncio.run(main())
+    assert quit_ok and result.ok
+    assert registry.log == [
+        "launch_keynote",
+        "create_outline",
+        "quit_keynote",
+        "launch_keynote",
+        "create_outline",
+    ]
+    health = manager.health()
+    assert health["running"]
+    assert health["launches"] == 2
+    assert health["restarts"] == 0
+
+
+def test_no_quit_while_scripts_run_or_keynote_is_in_use():
+    registry = StubRegistry(quit_output="QUIT:in-use")
+    manager = KeynoteAppManager(registry=registry, idle_timeout=0)
+    manager.ensure_running()
+    manager._begin()
+    assert not manager.shutdown()
+    assert "quit_keynote" not in registry.log
+    manager._finish()
+    assert not manager.shutdown()
+    assert manager.health()["running"]
+
+
+def test_crash_is_counted_as_a_restart():
+    registry = StubRegistry()
+    manager = KeynoteAppManager(registry=registry, idle_timeout=0)
+    manager.ensure_running()
+    registry.keynote_running = False
+    assert asyncio.run(manager.run_async("create_outline")).ok
+    assert manager.health()["restarts"] == 1
+    assert manager.health()["launches"] == 2
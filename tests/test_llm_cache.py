@@ -0,0 +1,25 @@
+import os
+import time
+
+from llm_cache import LLMCache
+
+
+def test_round_trip_through_disk(tmp_path):
+    LLMCache(directory=str(tmp_path), ttl=60, enabled=True).put("m", "prompt", "text")
+    cached = LLMCache(directory=str(tmp_path), ttl=60, enabled=True).get("m", "prompt")
+    assert cached.text == "text"
+
+
+def test_first_put_prunes_expired_entries(tmp_path):
+    old = LLMCache(directory=str(tmp_path), ttl=60, enabled=True)
+    old.put("m", "old prompt", "old")
+    stale = time.time() - 120
+    for root, _, names in os.walk(tmp_path):
+        for name in names:
+            os.utime(os.path.join(root, name), (stale, stale))
+    cache = LLMCache(directory=str(tmp_path), ttl=60, enabled=True)
+    cache.put("m", "new prompt", "new")
+    files = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert len(files) == 1
+    assert cache.stats()["pruned"] == 1
+    assert cache.get("m", "old prompt") is None
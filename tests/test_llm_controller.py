@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from llm_controller import AIMDLimiter, LLMController, is_retryable, is_throttle
+
+
+def test_controller_works_across_event_loops():
+    controller = LLMController(
+        requests_per_minute=6000, tokens_per_minute=0, max_concurrency=2, max_retries=0
+    )
+
+    async def batch():
+        async def call():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        return await asyncio.gather(*(controller.call(call) for _ in range(6)))
+
+    # Each asyncio.run is a new loop; the limiter queues calls in both
+    assert asyncio.run(batch()) == ["ok"] * 6
+    assert asyncio.run(batch()) == ["ok"] * 6
+    assert controller.limiter.in_flight == 0
+
+
+class APIError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(message or f"{code} error")
+        self.code = code
+
+
+def test_throttle_detection_needs_the_status():
+    assert is_throttle(APIError(429))
+    assert is_throttle(RuntimeError("RESOURCE_EXHAUSTED: quota"))
+    assert not is_throttle(RuntimeError("No such file: /tmp/deck-429.key"))
+    assert not is_retryable(ValueError("request id 4290"))
+    assert is_retryable(APIError(503))
+
+
+def test_aimd_halves_on_throttle_and_regrows():
+    async def main():
+        limiter = AIMDLimiter(8)
+        await limiter.on_throttle()
+        assert limiter.limit == 4
+        await limiter.on_throttle()
+        await limiter.on_throttle()
+        await limiter.on_throttle()
+        assert limiter.limit == 1  # never below min_limit
+        # +1/limit per success, i.e. +1 slot per window of `limit` successes
+        await limiter.on_success()
+        assert limiter.limit == 2
+        await limiter.on_success()
+        await limiter.on_success()
+        assert 2 < limiter.limit < 3
+        for _ in range(100):
+            await limiter.on_success()
+        assert limiter.limit == 8
+
+    asyncio.run(main())
+
+
+def controller(**overrides):
+    settings = dict(
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        max_concurrency=4,
+        max_retries=3,
+        base_delay=0.001,
+        max_delay=0.001,
+    )
+    settings.update(overrides)
+    return LLMController(**settings)
+
+
+def failing(errors):
+    """make_call that raises the given errors in turn, then returns "ok"."""
+    errors = list(errors)
+    attempts = []
+
+    async def call():
+        attempts.append(len(attempts))
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return call, attempts
+
+
+def test_retries_transient_errors_then_succeeds():
+    llm = controller()
+    call, attempts = failing([APIError(429), APIError(503)])
+    assert asyncio.run(llm.call(call)) == "ok"
+    assert len(attempts) == 3
+    stats = llm.stats()
+    assert (stats["retries"], stats["throttles"], stats["failures"]) == (2, 1, 0)
+    assert stats["concurrency_limit"] < 4
+
+
+def test_gives_up_on_non_retryable_errors():
+    llm = controller()
+    call, attempts = failing([APIError(400, "bad request")])
+    with pytest.raises(APIError):
+        asyncio.run(llm.call(call))
+    assert len(attempts) == 1
+    assert llm.stats()["retries"] == 0
+    assert llm.stats()["failures"] == 1
+
+
+def test_stops_after_max_retries():
+    llm = controller(max_retries=2)
+    call, attempts = failing([APIError(503)] * 5)
+    with pytest.raises(APIError):
+        asyncio.run(llm.call(call))
+    assert len(attempts) == 3
+    assert llm.stats()["retries"] == 2
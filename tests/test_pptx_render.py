@@ -0,0 +1,73 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from pptx_render import render_pptx
+from slide_model import normalize_slides
+
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+SLIDES = normalize_slides(
+    [
+        {"title": 'Tom & Jerry <"quoted"> \'single\'', "bullets": ["a < b", "bell\x07 tab\t"]},
+        {"title": "Second\x01\x0b", "bullets": []},
+        {
+            "title": "Shapes",
+            "bullets": ["x"],
+            "shapes": [{"text": "line 1\nline 2 & more", "width": 200, "height": 100}],
+        },
+    ]
+)
+
+
+def render(tmp_path):
+    path = tmp_path / "deck.pptx"
+    assert render_pptx(SLIDES, str(path)) == len(SLIDES)
+    with zipfile.ZipFile(path) as package:
+        return {name: ET.fromstring(package.read(name)) for name in package.namelist()}
+
+
+def texts(part):
+    return ["".join(t.text or "" for t in p.iter(A + "t")) for p in part.iter(A + "p")]
+
+
+def test_every_part_parses_and_text_survives_escaping(tmp_path):
+    parts = render(tmp_path)
+    assert texts(parts["ppt/slides/slide1.xml"]) == [
+        'Tom & Jerry <"quoted"> \'single\'',
+        "a < b",
+        "bell tab\t",
+    ]
+    assert texts(parts["ppt/slides/slide2.xml"])[0] == "Second"
+    assert texts(parts["ppt/slides/slide3.xml"])[-2:] == ["line 1", "line 2 & more"]
+
+
+def test_slide_ids_match_the_presentation_relationships(tmp_path):
+    parts = render(tmp_path)
+    rels = {
+        rel.get("Id"): rel.get("Target")
+        for rel in parts["ppt/_rels/presentation.xml.rels"].iter(RELS + "Relationship")
+    }
+    slide_ids = parts["ppt/presentation.xml"].find(P + "sldIdLst")
+    targets = [rels[slide_id.get(R + "id")] for slide_id in slide_ids]
+    assert targets == [f"slides/slide{n}.xml" for n in range(1, len(SLIDES) + 1)]
+    master = parts["ppt/presentation.xml"].find(P + "sldMasterIdLst")[0]
+    assert rels[master.get(R + "id")] == "slideMasters/slideMaster1.xml"
+
+
+def test_every_relationship_target_and_override_exists(tmp_path):
+    parts = render(tmp_path)
+    for name, part in parts.items():
+        if not name.endswith(".rels"):
+            continue
+        base = posixpath.dirname(posixpath.dirname(name))
+        for rel in part.iter(RELS + "Relationship"):
+            assert posixpath.normpath(posixpath.join(base, rel.get("Target"))) in parts
+    types = parts["[Content_Types].xml"]
+    overrides = {o.get("PartName").lstrip("/") for o in types if o.get("PartName")}
+    assert overrides == {name for name in parts if not name.endswith(".rels")} - {
+        "[Content_Types].xml"
+    }
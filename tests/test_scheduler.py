@@ -0,0 +1,53 @@
+import asyncio
+
+from scheduler import DocumentScheduler
+
+
+def run_all(scheduler, documents, log):
+    async def operation(document, n):
+        log.append(("start", document, n))
+        await asyncio.sleep(0.02)
+        log.append(("end", document, n))
+        return n
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                scheduler.run(document, lambda d=document, n=n: operation(d, n))
+                for n, document in enumerate(documents)
+            )
+        )
+
+    return asyncio.run(main())
+
+
+def peak_running(log):
+    running = peak = 0
+    for event, _, _ in log:
+        running += 1 if event == "start" else -1
+        peak = max(peak, running)
+    return peak
+
+
+def test_same_document_runs_in_arrival_order():
+    log = []
+    assert run_all(DocumentScheduler(max_concurrency=4), ["a", "a", "a"], log) == [0, 1, 2]
+    assert log == [(event, "a", n) for n in range(3) for event in ("start", "end")]
+
+
+def test_concurrency_is_capped():
+    log = []
+    scheduler = DocumentScheduler(max_concurrency=2)
+    run_all(scheduler, ["a", "b", "c", "d", "e"], log)
+    assert peak_running(log) == 2
+    assert scheduler.stats()["completed"] == 5
+    assert scheduler.stats()["documents"] == 0
+
+
+def test_works_across_event_loops():
+    scheduler = DocumentScheduler(max_concurrency=1)
+    # Contended in both loops, so both wait on the semaphore and the locks
+    for _ in range(2):
+        log = []
+        run_all(scheduler, ["a", "a", "b", "c"], log)
+        assert peak_running(log) == 1
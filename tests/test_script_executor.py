@@ -0,0 +1,66 @@
+import pytest
+
+from bench_support import fake_osascript_environment
+from script_executor import PooledExecutor, SubprocessExecutor
+
+
+@pytest.fixture(params=["subprocess", "pool"])
+def executor(request, monkeypatch):
+    for name, value in fake_osascript_environment().items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setenv("FAKE_OSASCRIPT_LATENCY", "0")
+    monkeypatch.setenv("FAKE_OSASCRIPT_STARTUP", "0")
+    if request.param == "pool":
+        executor = PooledExecutor(size=1)
+    else:
+        executor = SubprocessExecutor()
+    yield executor
+    executor.close()
+
+
+def test_runs_a_script(executor):
+    result = executor.run('return "hello"')
+    assert result.ok
+    assert not result.timed_out
+
+
+def test_failure_maps_the_error_number(executor):
+    result = executor.run("-- fake: fail")
+    assert not result.ok
+    if executor.name == "pool":
+        assert result.returncode == -2700
+    else:
+        assert result.returncode == 1
+    assert "simulated failure" in result.stderr
+
+
+def test_timeout_kills_the_script(executor):
+    result = executor.run("-- fake: sleep 5", timeout=0.5)
+    assert result.timed_out
+    assert result.returncode == -1
+    assert result.elapsed < 3
+    # The executor still works afterwards
+    assert executor.run('return "after"').ok
+
+
+def test_crash_is_reported_and_recovered(executor):
+    result = executor.run("-- fake: crash")
+    assert not result.ok
+    assert executor.run('return "after"').ok
+
+
+def test_pool_restarts_crashed_and_stuck_workers(executor):
+    if executor.name != "pool":
+        pytest.skip("only the pool keeps workers")
+    executor.run('return "warm"')
+    assert executor.stats()["restarts"] == 0
+    result = executor.run("-- fake: crash")
+    assert result.stderr == "Worker exited while running script"
+    assert executor.stats()["restarts"] == 1
+    executor.run("-- fake: sleep 5", timeout=0.3)
+    assert executor.stats() == {
+        "backend": "pool",
+        "workers": 1,
+        "alive": 1,
+        "restarts": 2,
+    }
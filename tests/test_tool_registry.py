@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+from tool_registry import ToolRegistry, compile_coercer
+
+SCHEMA = {
+    "properties": {
+        "title": {"type": "string"},
+        "count": {"type": "integer"},
+        "scale": {"type": "number"},
+        "export": {"type": "boolean", "default": False},
+        "slides": {"type": "array"},
+        "theme": {"anyOf": [{"type": "object"}, {"type": "null"}], "default": None},
+        "layout": {"type": "string", "enum": ["title", "bullets"], "default": "title"},
+    },
+    "required": ["title", "count"],
+}
+
+
+def test_converts_to_schema_types():
+    coerce = compile_coercer(SCHEMA)
+    arguments = coerce(
+        ["Intro", "3.0", "1.5", "yes", "['a', 'b']", '{"font": "Helvetica"}', "bullets"]
+    )
+    assert arguments == {
+        "title": "Intro",
+        "count": 3,
+        "scale": 1.5,
+        "export": True,
+        "slides": ["a", "b"],
+        "theme": {"font": "Helvetica"},
+        "layout": "bullets",
+    }
+
+
+def test_missing_optional_parameters_take_defaults():
+    assert compile_coercer(SCHEMA)(["Intro", "2"]) == {
+        "title": "Intro",
+        "count": 2,
+        "export": False,
+        "theme": None,
+        "layout": "title",
+    }
+
+
+def test_extra_parameters_are_ignored():
+    schema = {"properties": {"text": {"type": "string"}}}
+    assert compile_coercer(schema)(["hello", "extra"]) == {"text": "hello"}
+
+
+@pytest.mark.parametrize(
+    "params, message",
+    [
+        (["Intro"], "Missing required parameter: count"),
+        (["Intro", "2.5"], "Invalid value for parameter count"),
+        (["Intro", "2", "1", "maybe"], "Invalid value for parameter export"),
+        (["Intro", "2", "1", "no", "{'a': 1}"], "Invalid value for parameter slides"),
+        (["Intro", "2", "1", "no", "["], "Invalid value for parameter slides"),
+        (["Intro", "2", "1", "no", "[]", "{}", "grid"], "Parameter layout must be one of"),
+    ],
+)
+def test_bad_values_name_the_parameter(params, message):
+    with pytest.raises(ValueError, match=message):
+        compile_coercer(SCHEMA)(params)
+
+
+def test_registry_rejects_unknown_tools():
+    tool = SimpleNamespace(name="create", description="Create", inputSchema=SCHEMA)
+    registry = ToolRegistry([tool])
+    assert registry.coerce("create", ("Intro", "1"))["count"] == 1
+    with pytest.raises(ValueError, match="Unknown tool: delete"):
+        registry.coerce("delete", ())
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+import mcp_server
+from deck_manifest import ManifestStore
+
+SLIDES = [{"title": "Intro", "bullets": ["One"]}]
+
+
+@pytest.fixture
+def manifests(tmp_path, monkeypatch):
+    store = ManifestStore(root=str(tmp_path / "manifests"))
+    monkeypatch.setattr(mcp_server, "manifests", store)
+    return store
+
+
+def update(path):
+    result = asyncio.run(mcp_server.update_presentation(SLIDES, str(path)))
+    return result["content"][0].text
+
+
+def test_deck_without_manifest_is_left_untouched(tmp_path, manifests):
+    deck = tmp_path / "mine.key"
+    deck.write_bytes(b"made by hand")
+    assert "left untouched" in update(deck)
+    assert deck.read_bytes() == b"made by hand"
+
+
+def test_deck_edited_since_its_manifest_is_left_untouched(tmp_path, manifests):
+    deck = tmp_path / "deck.key"
+    deck.write_bytes(b"generated")
+    manifests.put(str(deck), SLIDES)
+    deck.write_bytes(b"edited by hand")
+    assert "new output_path" in update(deck)
+    assert deck.read_bytes() == b"edited by hand"
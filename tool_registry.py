@@ -0,0 +1,137 @@
+"""Tools from ``list_tools()``, indexed and compiled once per session.
+
+``ToolRegistry`` maps tool names to tools and, for each tool, holds an argument
+coercer compiled from its ``inputSchema``: positional FUNCTION_CALL parameters are
+converted to the schema types (integer, number, boolean, array, object, string),
+missing optional parameters take their schema defaults, and bad or missing values
+raise ValueError naming the parameter. ``fingerprint`` hashes the tool list so that
+anything derived from it (descriptions, prompts, declarations) can be cached.
+"""
+
+import ast
+import hashlib
+import json
+
+
+def _parse_literal(value):
+    """JSON first, then a Python literal (models like single quotes)."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return ast.literal_eval(value)
+
+
+def _to_integer(value):
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is not a whole number")
+    return int(number)
+
+
+def _to_boolean(value):
+    lowered = str(value).strip().lower()
+    if lowered in ("true", "1", "yes"):
+        return True
+    if lowered in ("false", "0", "no"):
+        return False
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+def _to_container(kind):
+    def convert(value):
+        parsed = _parse_literal(value) if isinstance(value, str) else value
+        if not isinstance(parsed, kind):
+            raise ValueError(f"expected a JSON {kind.__name__}, got {type(parsed).__name__}")
+        return parsed
+
+    return convert
+
+
+CONVERTERS = {
+    "integer": _to_integer,
+    "number": float,
+    "boolean": _to_boolean,
+    "array": _to_container(list),
+    "object": _to_container(dict),
+    "string": str,
+}
+
+
+def schema_type(info):
+    """The JSON type of a property; optional types (anyOf [T, null]) count as T."""
+    if "type" in info:
+        return info["type"]
+    for option in info.get("anyOf", []):
+        if option.get("type", "null") != "null":
+            return option["type"]
+    return "string"
+
+
+def compile_coercer(schema):
+    """Build a function turning positional string parameters into tool arguments."""
+    properties = schema.get("properties", {})
+    required = set(schema.get("required", []))
+    fields = [
+        (name, CONVERTERS.get(schema_type(info), str), info)
+        for name, info in properties.items()
+    ]
+
+    def coerce(params):
+        if len(params) > len(fields):
+            print(f"Ignoring {len(params) - len(fields)} extra parameters")
+        arguments = {}
+        for index, (name, convert, info) in enumerate(fields):
+            if index >= len(params):
+                if name in required:
+                    raise ValueError(f"Missing required parameter: {name}")
+                if "default" in info:
+                    arguments[name] = info["default"]
+                continue
+            try:
+                value = convert(params[index])
+            except (ValueError, SyntaxError) as e:
+                raise ValueError(f"Invalid value for parameter {name}: {e}") from None
+            if "enum" in info and value not in info["enum"]:
+                raise ValueError(f"Parameter {name} must be one of {info['enum']}")
+            arguments[name] = value
+        return arguments
+
+    return coerce
+
+
+class ToolRegistry:
+    def __init__(self, tools):
+        self.tools = list(tools)
+        self.by_name = {tool.name: tool for tool in self.tools}
+        self.coercers = {
+            tool.name: compile_coercer(tool.inputSchema or {}) for tool in self.tools
+        }
+        self.fingerprint = hashlib.sha256(
+            json.dumps(
+                [[t.name, t.description, t.inputSchema] for t in self.tools],
+                sort_keys=True,
+            ).encode("utf-8")
+        ).hexdigest()
+        self._derived = {}
+
+    def __iter__(self):
+        return iter(self.tools)
+
+    def __len__(self):
+        return len(self.tools)
+
+    def get(self, name):
+        tool = self.by_name.get(name)
+        if tool is None:
+            raise ValueError(f"Unknown tool: {name} (available: {', '.join(self.by_name)})")
+        return tool
+
+    def coerce(self, name, params):
+        self.get(name)
+        return self.coercers[name](list(params))
+
+    def derived(self, key, build):
+        """Compute something from the tool list once per registry."""
+        if key not in self._derived:
+            self._derived[key] = build(self)
+        return self._derived[key]
@@ -0,0 +1,134 @@
+"""Lightweight spans for the hot path.
+
+A ``Tracer`` times named spans (handshake, llm, coercion, render, script, save, ...)
+into a ``metrics.StageStats`` and, when its output is configured, writes each
+finished span as one JSON line:
+
+    {"ts": 1760000000.123, "service": "keynote-mcp-server", "name": "script",
+     "trace": "9f0c...", "span": "41ab...", "parent": "77e2...",
+     "duration_ms": 301.6, "status": "ok", "template": "create_outline"}
+
+The output comes from an environment variable naming ``stderr`` or a file path
+(appended to); unset or empty writes nothing and only the statistics are kept.
+Spans nest through a context variable, so spans opened inside a span (including
+from ``asyncio`` tasks and ``asyncio.to_thread``) share its trace id.
+"""
+
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from metrics import StageStats
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+
+def _new_id():
+    return uuid.uuid4().hex[:16]
+
+
+class Tracer:
+    def __init__(self, service, stats=None, output=None, env="TRACE_OUTPUT"):
+        self.service = service
+        self.stats = stats if stats is not None else StageStats()
+        if output is None:
+            output = os.getenv(env, "")
+        self.output = output
+        self.counters = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed block as span ``name``; yields its attribute dict,
+        which the block may add to."""
+        parent = _current.get()
+        trace_id = parent[0] if parent else _new_id()
+        span_id = _new_id()
+        token = _current.set((trace_id, span_id))
+        status = "ok"
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            status = "error"
+            attributes.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            self.stats.record(name, elapsed)
+            self._emit(
+                name,
+                started,
+                elapsed,
+                trace_id,
+                span_id,
+                parent[1] if parent else None,
+                status,
+                attributes,
+            )
+
+    def record(self, name, seconds, **attributes):
+        """Record a span measured elsewhere (e.g. a wait reported by a script),
+        as a child of the current span, ending now."""
+        parent = _current.get()
+        self.stats.record(name, seconds)
+        self._emit(
+            name,
+            time.time() - seconds,
+            seconds,
+            parent[0] if parent else _new_id(),
+            _new_id(),
+            parent[1] if parent else None,
+            "ok",
+            attributes,
+        )
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self, histograms=False):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "spans": self.stats.snapshot(histograms=histograms),
+            "counters": counters,
+        }
+
+    def _emit(self, name, started, elapsed, trace_id, span_id, parent_id, status, attributes):
+        if not self.output:
+            return
+        record = {
+            "ts": round(started, 6),
+            "service": self.service,
+            "name": name,
+            "trace": trace_id,
+            "span": span_id,
+            "parent": parent_id,
+            "duration_ms": round(elapsed * 1000, 3),
+            "status": status,
+        }
+        record.update(attributes)
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            try:
+                self._stream().write(line)
+            except OSError as e:
+                # Tracing must never break the request it observes
+                print(f"Disabling trace output {self.output}: {e}", file=sys.stderr)
+                self.output = ""
+
+    def _stream(self):
+        if self.output == "stderr":
+            return sys.stderr
+        if self._file is None:
+            self._file = open(self.output, "a", buffering=1)
+        return self._file
@@ -0,0 +1,216 @@
+"""Keep pre-spawned MCP servers ready for the next agent connection.
+
+Starting ``mcp_server.py`` costs an interpreter, the mcp/pydantic imports, template
+compilation and the script workers before the first tool call can run. This
+launcher pays that ahead of time: it keeps ``--standby`` server processes started
+with ``KEYNOTE_PREWARM=1`` (see ``mcp_server.warm_up``) and, when an agent connects
+to its Unix socket, hands it a ready process and starts the next one. Each
+connection still gets a server of its own, as with stdio.
+
+    python warm_server.py --socket /tmp/keynote-mcp.sock
+    python agent.py --server-socket /tmp/keynote-mcp.sock   # or AGENT_SERVER_SOCKET
+
+Servers inherit this launcher's environment, not the agent's, so KEYNOTE_* settings
+belong here.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# mcp_server logs this line once warm_up() is done and it is about to read stdin
+READY_LINE = b"STARTING KEYNOTE MCP SERVER"
+
+# How long a server may take to exit after its client hung up
+EXIT_TIMEOUT = 5.0
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+class WarmServerPool:
+    def __init__(self, command=None, standby=1, prewarm="1"):
+        self.command = command or [sys.executable, os.path.join(HERE, "mcp_server.py")]
+        self.standby = max(1, standby)
+        self.env = dict(os.environ, KEYNOTE_PREWARM=prewarm)
+        self.served = 0
+        self._ready = asyncio.Queue()
+        self._tasks = set()
+
+    def start(self):
+        for _ in range(self.standby):
+            self._spawn()
+
+    def _spawn(self):
+        task = asyncio.create_task(self._start_server())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _start_server(self):
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=self.env,
+        )
+        ready = False
+        # Forward the server's log, and queue it once it reports it is ready
+        while line := await process.stderr.readline():
+            sys.stderr.buffer.write(line)
+            sys.stderr.flush()
+            if not ready and READY_LINE in line:
+                ready = True
+                log(f"Standby server {process.pid} ready")
+                await self._ready.put(process)
+        if not ready:
+            log(f"Standby server {process.pid} exited before it was ready")
+            await process.wait()
+            self._spawn()
+
+    async def take(self):
+        """The next ready server; a replacement starts warming right away."""
+        while True:
+            process = await self._ready.get()
+            self._spawn()
+            if process.returncode is None:
+                return process
+
+    async def handle(self, reader, writer):
+        process = await self.take()
+        self.served += 1
+        log(f"Connection {self.served} served by server {process.pid}")
+
+        async def pump(source, destination):
+            try:
+                while data := await source.read(65536):
+                    destination.write(data)
+                    await destination.drain()
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                # EOF on the server's stdin is how stdio clients end a session
+                destination.close()
+
+        try:
+            await asyncio.gather(
+                pump(reader, process.stdin), pump(process.stdout, writer)
+            )
+        finally:
+            try:
+                await asyncio.wait_for(process.wait(), EXIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                process.terminate()
+                await process.wait()
+
+    async def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+        while not self._ready.empty():
+            process = self._ready.get_nowait()
+            if process.returncode is None:
+                process.stdin.close()
+                try:
+                    await asyncio.wait_for(process.wait(), EXIT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    process.terminate()
+
+
+async def serve(socket_path, standby=1, prewarm="1"):
+    pool = WarmServerPool(standby=standby, prewarm=prewarm)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    pool.start()
+    server = await asyncio.start_unix_server(pool.handle, path=socket_path)
+    log(f"Warm server pool listening on {socket_path} ({pool.standby} standby)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await pool.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+@asynccontextmanager
+async def socket_client(socket_path):
+    """MCP client transport over the launcher's socket; the counterpart of
+    mcp.client.stdio.stdio_client, yielding the same (read, write) streams."""
+    import anyio
+    from mcp import types
+    from mcp.shared.message import SessionMessage
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+    connection = await anyio.connect_unix(socket_path)
+
+    async def socket_reader():
+        try:
+            async with read_stream_writer:
+                buffer = b""
+                async for chunk in connection:
+                    lines = (buffer + chunk).split(b"\n")
+                    buffer = lines.pop()
+                    for line in lines:
+                        if not line.strip():
+                            continue
+                        try:
+                            message = types.JSONRPCMessage.model_validate_json(line)
+                        except Exception as exc:
+                            await read_stream_writer.send(exc)
+                            continue
+                        await read_stream_writer.send(SessionMessage(message))
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await anyio.lowlevel.checkpoint()
+
+    async def socket_writer():
+        try:
+            async with write_stream_reader:
+                async for session_message in write_stream_reader:
+                    json = session_message.message.model_dump_json(
+                        by_alias=True, exclude_none=True
+                    )
+                    await connection.send((json + "\n").encode("utf-8"))
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg, connection:
+        tg.start_soon(socket_reader)
+        tg.start_soon(socket_writer)
+        try:
+            yield read_stream, write_stream
+        finally:
+            # Hang up our side; the launcher then closes the server's stdin
+            try:
+                await connection.send_eof()
+            except (anyio.ClosedResourceError, anyio.BrokenResourceError, OSError):
+                pass
+            tg.cancel_scope.cancel()
+            await read_stream.aclose()
+            await write_stream.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default="/tmp/keynote-mcp.sock")
+    parser.add_argument("--standby", type=int, default=1, help="servers kept ready")
+    parser.add_argument(
+        "--prewarm",
+        choices=("1", "keynote"),
+        default="1",
+        help="1: compile templates and start script workers; keynote: also launch Keynote",
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.socket, args.standby, args.prewarm))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()